@@ -1,14 +1,25 @@
+import asyncio
 import random
+import aiohttp
 import langchain
+import openai
 import pandas as pd
+import requests
+import requests.adapters
 from langchain.chat_models import ChatOpenAI
 from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 from langchain.chains import create_extraction_chain_pydantic
-from jinja2 import Environment, FileSystemLoader
 from datetime import datetime
-from fuzzywuzzy import process
-import pdfkit
+from peewee import SqliteDatabase
+import config
+from catalog import ProductCatalog, current_catalog, get_catalog
+from extraction_cache import ExtractionCache
+from matcher import matcher_for
+from pdf_service import get_pdf_service
+from solver import Solution, solver_for
+from templates import get_registry
+from utils import write_bytes
 
 
 
@@ -25,100 +36,179 @@ class Order(BaseModel):
     company_name: str = Field(description="Name of the company")
 
 class OrderExtractor:
-    def __init__(self, openai_api_key: str) -> None:
+    # Meant to live for the whole process: the chain is built once and every call reuses one pooled HTTP session
+    # (aiohttp for aextract_order, requests for extract_order) instead of opening new connections per order.
+    def __init__(
+        self,
+        openai_api_key: str,
+        model_name: str = "gpt-3.5-turbo",
+        request_timeout: float = config.LLM_TIMEOUT,
+        max_retries: int = config.LLM_MAX_RETRIES,
+        max_connections: int = config.LLM_MAX_CONNECTIONS,
+        cache: Optional[ExtractionCache] = None,
+    ) -> None:
         self.openai_api_key = openai_api_key
-        self.llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0, verbose=True, openai_api_key=self.openai_api_key)
+        self.cache = cache
+        self.request_timeout = request_timeout
+        self.max_connections = max_connections
+        self.llm = ChatOpenAI(
+            model_name=model_name,
+            temperature=0,
+            verbose=True,
+            openai_api_key=self.openai_api_key,
+            request_timeout=request_timeout,
+            max_retries=max_retries,
+        )
+        self.chain = create_extraction_chain_pydantic(pydantic_schema=Order, llm=self.llm)
+        self._session = None
+        self._aiosession = None
+
+    def _requests_session(self) -> requests.Session:
+        if self._session is None:
+            self._session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+            self._session.mount("https://", adapter)
+        return self._session
+
+    def _aiohttp_session(self) -> aiohttp.ClientSession:
+        # aiohttp sessions belong to the loop they were created on, so this is only called from aextract_order
+        if self._aiosession is None or self._aiosession.closed:
+            self._aiosession = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            )
+        return self._aiosession
 
     def extract_order(self, prompt: str) -> Order:
-        chain = create_extraction_chain_pydantic(pydantic_schema=Order, llm=self.llm)
-        return chain.run(prompt)
+        if self.cache is not None and (orders := self.cache.get(prompt)) is not None:
+            return orders
+        # In openai 0.28 only aiosession is a ContextVar; requestssession is a plain module attribute
+        openai.requestssession = self._requests_session()
+        orders = self.chain.run(prompt)
+        if self.cache is not None:
+            self.cache.put(prompt, orders)
+        return orders
+
+    async def aextract_order(self, prompt: str) -> Order:
+        if self.cache is not None and (orders := await asyncio.to_thread(self.cache.get, prompt)) is not None:
+            return orders
+        token = openai.aiosession.set(self._aiohttp_session())
+        try:
+            orders = await self.chain.arun(prompt)
+        finally:
+            openai.aiosession.reset(token)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, prompt, orders)
+        return orders
+
+    async def aclose(self) -> None:
+        if self._aiosession is not None:
+            await self._aiosession.close()
+        if self._session is not None:
+            if openai.requestssession is self._session:
+                openai.requestssession = None
+            self._session.close()
+
+
+_order_extractor: Optional[OrderExtractor] = None
+
+
+def get_order_extractor() -> OrderExtractor:
+    global _order_extractor
+    if _order_extractor is None:
+        if not config.OPENAI_API_KEY:
+            raise RuntimeError("OPENAI_API_KEY is not set, order extraction needs an OpenAI API key")
+        cache = None
+        if config.EXTRACTION_CACHE_PATH:
+            cache = ExtractionCache(
+                SqliteDatabase(config.EXTRACTION_CACHE_PATH),
+                load=Order.parse_obj,
+                memory_size=config.EXTRACTION_CACHE_MEMORY,
+                ttl=config.EXTRACTION_CACHE_TTL,
+                max_rows=config.EXTRACTION_CACHE_ROWS,
+            )
+        _order_extractor = OrderExtractor(openai_api_key=config.OPENAI_API_KEY, cache=cache)
+    return _order_extractor
+
     
+class LineItem:
+    # One row of the invoice table. Kept as a plain slotted record so building an invoice never copies a DataFrame.
+    __slots__ = ('description', 'quantity', 'unit_price', 'amount', 'row_id')
+
+    COLUMNS = ['DESCRIPTION', 'QUANTITY', 'UNIT PRICE (£)', 'AMOUNT (£)']
+
+    def __init__(self, description: str, quantity: int, unit_price: float, amount: float, row_id: Optional[int] = None) -> None:
+        self.description = description
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.amount = amount
+        self.row_id = row_id  # Price index row, None for rows that are not catalog products (delivery)
+
+    @property
+    def is_delivery(self) -> bool:
+        return self.description == 'Delivery'
+
+    def to_dict(self) -> dict:
+        return dict(zip(self.COLUMNS, (self.description, self.quantity, self.unit_price, self.amount)))
+
+    def __repr__(self) -> str:
+        return f"LineItem({self.description!r}, {self.quantity}, {self.unit_price}, {self.amount})"
+
+
+def line_items_to_dataframe(line_items: List[LineItem]) -> pd.DataFrame:
+    return pd.DataFrame([item.to_dict() for item in line_items], columns=LineItem.COLUMNS)
+
+
 class InvoiceGenerator:
-    def __init__(self, html_template_path: str, product_file_path: str, html_dir: str = "html") -> None:
+    def __init__(self, html_template_path: str, product_file_path: str = "products.xlsx", html_dir: str = "html", catalog: Optional[ProductCatalog] = None, amount_solver: str = "exact") -> None:
+        if amount_solver not in ("exact", "greedy"):
+            raise ValueError(f"Unsupported amount solver: {amount_solver}")
         self.html_path = html_template_path
-        self.env = Environment(loader=FileSystemLoader(html_dir))
-        self.template = self.env.get_template(self.html_path)
+        self.amount_solver = amount_solver
+        self.templates = get_registry(html_dir)
+        self.template = self.templates.get(self.html_path)
         
-        self.load_product_file(product_file_path)
+        if catalog is not None:
+            self.catalog = catalog
+        else:
+            self.load_product_file(product_file_path)
         self.context = {} 
+        self.line_items: List[LineItem] = []
 
     def load_product_file(self, file_path: str) -> 'InvoiceGenerator':
-        file_extension = file_path.split('.')[-1]
-        if file_extension == 'csv':
-            self.products_df = pd.read_csv(file_path)
-        elif file_extension == 'xlsx':
-            self.products_df = pd.read_excel(file_path)
-        else:
-            raise ValueError(f"Unsupported file type: {file_extension}")
+        # The workbook is parsed once per process, see catalog.reload_catalog to pick up edits
+        self.catalog = get_catalog(file_path)
         return self
 
+    @property
+    def products_df(self) -> pd.DataFrame:
+        return self.catalog.products_df
+
     def load_template(self) -> 'InvoiceGenerator':
-        self.template = self.env.get_template(self.html_path)
+        # Only re-reads the file in dev mode when it changed, otherwise this is the same compiled template
+        self.template = self.templates.get(self.html_path)
         return self
 
     def render_customer_details(self, customer_details: List[str]) -> 'InvoiceGenerator':    
-        customer_details_html = "".join(
-            '<tr>\n<td style="font-size: 14px;color: #000;font-family: arial;text-align: left;line-height: 20px;">\n'
-            + detail
-            + '\n</td>\n</tr>\n'
-            for detail in customer_details
-        )
-        self.context['customer_details'] = customer_details_html
+        self.context['customer_details'] = list(customer_details)
         return self
 
     def render_payment_details(self, account_holder: str, bank_name: str, sort_code: str, account_number: str, bank_address: str) -> 'InvoiceGenerator':
-        payment_details_html = (
-            '<p style="font-size: 13px;color: #000;font-family: arial;text-align: left;line-height: 20px;">Account'
-            f'holder: <strong>{account_holder}</strong> &nbsp; Bank: <strong>{bank_name}</strong> &nbsp; Sort code:'
-            f'<strong>{sort_code}</strong> &nbsp; Account No: <strong>{account_number}</strong> &nbsp; Bank address: <strong>{bank_address}'
-            '</strong></p>'
-        )
-        self.context['payment_details'] = payment_details_html
+        self.context['payment'] = {
+            'account_holder': account_holder,
+            'bank_name': bank_name,
+            'sort_code': sort_code,
+            'account_number': account_number,
+            'bank_address': bank_address,
+        }
         return self
 
     def render_invoice_table(self, product_names: Optional[List[str]], total_amount: float, quantity: int = 10) -> 'InvoiceGenerator':
         product_total = total_amount / 1.2
         vat = total_amount / 6
-        invoice_df = self.generate_invoice_products(product_names, product_total)
-        data_rows = []
-        for _, row in invoice_df.iterrows():
-            if row['DESCRIPTION'] == 'Delivery':
-                # Special formatting for delivery charges
-                data_rows.append(f"""
-                <tr>
-                    <td style="font-size: 14px;color: #000;font-family: arial;text-align: left;line-height: 20px; padding: 10px 15px; border-top: 2px solid #797778;">
-                        <strong>{row['DESCRIPTION']}</strong>
-                    </td>
-                    <td style="font-size: 14px;color: #000;font-family: arial;text-align: right;line-height: 20px; padding: 10px 15px; border-top: 2px solid #797778;">
-                        <strong>{row['QUANTITY']}</strong>
-                    </td>
-                    <td style="font-size: 14px;color: #000;font-family: arial;text-align: right;line-height: 20px; padding: 10px 15px; border-top: 2px solid #797778;">
-                        <strong>{row['UNIT PRICE (£)']}</strong>
-                    </td>
-                    <td style="font-size: 14px;color: #000;font-family: arial;text-align: right;line-height: 20px; padding: 10px 15px; border-top: 2px solid #797778;">
-                        <strong>{row['AMOUNT (£)']}</strong>
-                    </td>
-                </tr>
-                """)
-            else:
-                data_rows.append(f"""
-                <tr>
-                    <td style="font-size: 14px;color: #000;font-family: arial;text-align: left;line-height: 20px; padding: 10px 15px;">
-                        {row['DESCRIPTION']}
-                    </td>
-                    <td style="font-size: 14px;color: #000;font-family: arial;text-align: right;line-height: 20px; padding: 10px 15px;">
-                        {row['QUANTITY']}
-                    </td>
-                    <td style="font-size: 14px;color: #000;font-family: arial;text-align: right;line-height: 20px; padding: 10px 15px;">
-                        {row['UNIT PRICE (£)']}
-                    </td>
-                    <td style="font-size: 14px;color: #000;font-family: arial;text-align: right;line-height: 20px; padding: 10px 15px;">
-                        {row['AMOUNT (£)']}
-                    </td>
-                </tr>
-                """)
-
-        self.context['invoice_table'] = "\n".join(data_rows)
+        # The rows themselves are laid out by the line_item_row macro in the template
+        self.line_items = self.generate_line_items(product_names, product_total)
+        self.context['line_items'] = self.line_items
         self.context['vat'] = round(vat, 1)
         self.context['total'] = round(product_total, 1)
         self.context["full_amt"] = total_amount
@@ -133,29 +223,45 @@ class InvoiceGenerator:
         self.context.update(company_info)
         return self
     
-    def render_company_logo(self, logo_path: str, width: str = None, height: str = None) -> 'InvoiceGenerator':
-        logo_html = f'<img src="{logo_path}"'
-        if width is not None:
-            logo_html += f' width="{width}"'
-        if height is not None:
-            logo_html += f' height="{height}"'
-        logo_html += '>'
-        self.context['company_logo'] = logo_html
+    def render_company_logo(self, logo_path: Optional[str], width: str = None, height: str = None) -> 'InvoiceGenerator':
+        self.context['logo'] = {'src': logo_path, 'width': width, 'height': height} if logo_path else None
         return self
         
 
     def generate_invoice_products(self, product_names: Optional[List[str]], total_amount: float) -> pd.DataFrame:
+        return line_items_to_dataframe(self.generate_line_items(product_names, total_amount))
+
+    def generate_line_items(self, product_names: Optional[List[str]], total_amount: float) -> List[LineItem]:
+        available_rows = self.match_product_rows(product_names)
+        if self.amount_solver == "exact":
+            # The exact solver gives up when it can't get within tolerance in its time budget, the greedy pick is the fallback
+            if solution := solver_for(self.catalog.price_index).solve(available_rows, total_amount):
+                return self.solution_line_items(solution)
+        return self.greedy_line_items(available_rows, total_amount)
+
+    def match_product_rows(self, product_names: Optional[List[str]]) -> List[int]:
+        price_index = self.catalog.price_index
         # If no product names are provided, select from all products
         if not product_names:
-            available_products_df = self.products_df
-        else:
-            # Use fuzzy matching to find the best matches for each product name in the product_names list
-            matched_product_names = [process.extractOne(product_name, self.products_df['Product'].unique())[0] for product_name in product_names]
-            # Filter products_df to only include rows where the product name is in matched_product_names
-            available_products_df = self.products_df[self.products_df['Product'].isin(matched_product_names)]
+            return list(range(len(price_index)))
+        # Fuzzy match every requested name in one batch, against both product names and "Product - Flavour" pairs
+        return matcher_for(price_index).rows_for(product_names)
+
+    def solution_line_items(self, solution: Solution) -> List[LineItem]:
+        descriptions = self.catalog.price_index.descriptions
+        line_items = [
+            LineItem(descriptions[line.row_id], line.quantity, line.unit_price_pence / 100, line.amount_pence / 100, line.row_id)
+            for line in solution.lines
+        ]
+        line_items.append(LineItem('Delivery', 1, solution.delivery_pence / 100, solution.delivery_pence / 100))
+        return line_items
+
+    def greedy_line_items(self, available_rows: List[int], total_amount: float) -> List[LineItem]:
+        price_index = self.catalog.price_index
+        available_rows = list(available_rows)
         
-        # Initialize an empty DataFrame to store the selected products
-        selected_products_df = pd.DataFrame(columns=['DESCRIPTION', 'QUANTITY', 'UNIT PRICE (£)', 'AMOUNT (£)'])
+        # Lines are edited in place while the quantities are escalated, the table is only materialized when rendering
+        line_items: List[LineItem] = []
         
         # Initialize a variable to keep track of the total cost of the selected products
         total_cost = 0.0
@@ -163,63 +269,53 @@ class InvoiceGenerator:
         # Start a loop to select 7 to 20 products and add them to the invoice
         num_products = random.randint(7, 20)
         for _ in range(num_products):
-            if len(available_products_df) > 0:
+            if len(available_rows) > 0:
                 # Randomly select a product
-                selected_product = available_products_df.sample().reset_index(drop=True)
-                max_available_quantity = max(int(qty) for qty in map(str, selected_product.columns) if qty.isdigit())
-                product_price = selected_product.loc[0, str(max_available_quantity)] if str(max_available_quantity) in selected_product.columns else selected_product.loc[0, 'Price']
+                position = random.randrange(len(available_rows))
+                row_id = available_rows[position]
+                product_price = price_index.best_price(row_id)
                 product_cost = 10 * product_price  # We consider each pack as a unit of 10
                 
                 # Add this product to the invoice and update the total cost if it doesn't exceed the total amount
                 if total_cost + product_cost <= total_amount:
-                    selected_product_df = pd.DataFrame(
-                    [{
-                        'DESCRIPTION': f"{selected_product.loc[0, 'Product']} - {selected_product.loc[0, 'Flavour']}",
-                        'QUANTITY': 10,  # We consider each pack as a unit of 10
-                        'UNIT PRICE (£)': round(product_price, 2),
-                        'AMOUNT (£)': round(product_cost, 2),
-                    }]
-                    )
-                    selected_products_df = pd.concat([selected_products_df, selected_product_df], ignore_index=True)
+                    line_items.append(LineItem(
+                        price_index.descriptions[row_id],
+                        10,  # We consider each pack as a unit of 10
+                        round(product_price, 2),
+                        round(product_cost, 2),
+                        row_id,
+                    ))
                     total_cost += product_cost
 
                     # Remove the selected product from the available products
-                    available_products_df = available_products_df[available_products_df.index != selected_product.index[0]]
+                    available_rows.pop(position)
 
         # If the total cost is still less than the total amount after selecting the products, try to increase the quantities of the already selected products
-        while total_cost + 30 < total_amount and len(selected_products_df) > 0:  # Add a condition to ensure the delivery charge doesn't exceed 30
+        while total_cost + 30 < total_amount and len(line_items) > 0:  # Add a condition to ensure the delivery charge doesn't exceed 30
             # Flag to check if any product's quantity was increased
             increased = False
             
-            for i, row in selected_products_df.iterrows():
-                if row['QUANTITY'] >= 30:  # We limit the total quantity of each product to 30 packs (300 units)
+            for item in line_items:
+                if item.quantity >= 30:  # We limit the total quantity of each product to 30 packs (300 units)
                     continue
                     
-                product_name, product_flavour = row['DESCRIPTION'].split(' - ')
-                product_df = self.products_df[(self.products_df['Product'] == product_name) & (self.products_df['Flavour'] == product_flavour)]
-                quantity = (row['QUANTITY'] + 10) * 10  # We consider each pack as a unit of 10
+                quantity = (item.quantity + 10) * 10  # We consider each pack as a unit of 10
                 
-                # Get the price for the quantity from the product dataframe
-                if str(quantity) in product_df.columns:
-                    product_price = product_df.loc[product_df.index[0], str(quantity)]
-                else:
-                    # If the exact quantity is not present, use the price for the highest quantity less than the current quantity
-                    available_quantities = [int(qty) for qty in map(str, product_df.columns) if qty.isdigit() and int(qty) < quantity]
-                    highest_available_quantity = max(available_quantities) if available_quantities else 'Price'
-                    product_price = product_df.loc[product_df.index[0], str(highest_available_quantity)]
+                # Get the price of the highest tier not above the quantity, or the base price below every tier
+                product_price = price_index.price_at(item.row_id, quantity)
                 
                 product_cost = quantity * product_price
                 
                 # Check if increasing the quantity of this product will cause the total cost to exceed the total amount
-                if total_cost - row['AMOUNT (£)'] + product_cost > total_amount - 30:  # Add a condition to ensure the delivery charge doesn't exceed 30
+                if total_cost - item.amount + product_cost > total_amount - 30:  # Add a condition to ensure the delivery charge doesn't exceed 30
                     # If it will, skip this product and try the next one
                     continue
                 
                 # If it won't, increase the quantity of this product and update the total cost
-                selected_products_df.loc[i, 'QUANTITY'] += 10  # We consider each pack as a unit of 10
-                selected_products_df.loc[i, 'UNIT PRICE (£)'] = round(product_price, 2)
-                selected_products_df.loc[i, 'AMOUNT (£)'] = round(product_cost, 2)
-                total_cost = total_cost - row['AMOUNT (£)'] + product_cost
+                total_cost = total_cost - item.amount + product_cost
+                item.quantity += 10  # We consider each pack as a unit of 10
+                item.unit_price = round(product_price, 2)
+                item.amount = round(product_cost, 2)
                 
                 # Set the flag to True as the quantity of a product was increased
                 increased = True
@@ -234,31 +330,60 @@ class InvoiceGenerator:
         # Ensure the delivery charge doesn't exceed 30
         delivery_charges = min(30, delivery_charges)
         
-        # Add delivery charges as a separate row in the DataFrame
-        delivery_charge_df = pd.DataFrame(
-                [{
-                    'DESCRIPTION': 'Delivery',
-                    'QUANTITY': 1,
-                    'UNIT PRICE (£)': delivery_charges,
-                    'AMOUNT (£)': delivery_charges,
-                }]
-            )
-        selected_products_df = pd.concat([selected_products_df, delivery_charge_df], ignore_index=True)
+        # Add delivery charges as a separate line
+        line_items.append(LineItem('Delivery', 1, delivery_charges, delivery_charges))
         
-        return selected_products_df
+        return line_items
     
     
     def get_rendered_html(self) -> str:
         return self.template.render(self.context)
     
     
+    def to_pdf(self) -> bytes:
+        return get_pdf_service().render_sync(self.get_rendered_html())
+
     def html_to_pdf(self, output_file_path: str) -> 'InvoiceGenerator':
-        pdfkit.from_string(self.get_rendered_html(), output_file_path, options={"enable-local-file-access": True})
+        write_bytes(output_file_path, self.to_pdf())
         return self
 
+    async def render_pdf(self) -> bytes:
+        return await get_pdf_service().render(self.get_rendered_html())
+
 
         
     
+def warm_render_worker(product_file_path: str = "products.xlsx") -> None:
+    # Stage initializer for render workers: load the catalog, index it and compile the templates before the first invoice
+    price_index = current_catalog(product_file_path).price_index
+    matcher_for(price_index)
+    solver_for(price_index)
+    get_registry().warm()
+
+
+def build_invoice_html(
+    customer_details: List[str],
+    payment_details: Dict[str, str],
+    invoice_number: str,
+    logo_path: Optional[str],
+    product_names: Optional[List[str]],
+    total_amount: float,
+    company_info: Dict[str, str],
+    product_file_path: str = "products.xlsx",
+) -> str:
+    # Everything CPU-bound about an invoice, taking and returning plain data so it can run in a worker process
+    return (
+        InvoiceGenerator("invoice.html", catalog=current_catalog(product_file_path))
+        .render_customer_details(customer_details)
+        .render_payment_details(**payment_details)
+        .render_invoice_details(invoice_number)
+        .render_company_logo(logo_path, 200, 160)
+        .render_invoice_table(product_names, total_amount)
+        .render_company_info(company_info)
+        .get_rendered_html()
+    )
+
+
 if __name__ == "__main__":
     company_info = {
         "company_name": "XYZ Ltd",
@@ -0,0 +1,87 @@
+import base64
+import functools
+import os
+import re
+import sys
+import urllib.request
+from typing import Dict
+
+from markupsafe import Markup
+
+import config
+
+FONT_FAMILY = "Inter"
+FONT_WEIGHTS = (400, 500, 600, 700)
+FONT_FORMATS = {".ttf": "truetype", ".otf": "opentype", ".woff": "woff", ".woff2": "woff2"}
+GOOGLE_FONTS_CSS = "https://fonts.googleapis.com/css2?family={family}:wght@{weights}&display=swap"
+# An old WebKit user agent makes Google Fonts serve TrueType, which wkhtmltopdf's QtWebKit can load
+TTF_USER_AGENT = "Mozilla/5.0 (Windows NT 6.1) AppleWebKit/534.30 (KHTML, like Gecko) Safari/534.30"
+
+
+def font_dir(assets_dir: str = config.ASSETS_DIR) -> str:
+    return os.path.join(assets_dir, "fonts")
+
+
+def bundled_fonts(assets_dir: str = config.ASSETS_DIR) -> Dict[int, str]:
+    # Files are named <family>-<weight>.<ext>, e.g. Inter-500.ttf
+    fonts = {}
+    directory = font_dir(assets_dir)
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            stem, extension = os.path.splitext(name)
+            if extension in FONT_FORMATS and stem.startswith(f"{FONT_FAMILY}-") and stem.split("-")[-1].isdigit():
+                fonts[int(stem.split("-")[-1])] = os.path.join(directory, name)
+    return fonts
+
+
+def font_source(path: str, inline: bool) -> str:
+    extension = os.path.splitext(path)[1]
+    if inline:
+        with open(path, "rb") as file:
+            data = base64.b64encode(file.read()).decode("ascii")
+        return f"url(data:font/{extension[1:]};base64,{data}) format('{FONT_FORMATS[extension]}')"
+    return f"url(file://{os.path.abspath(path)}) format('{FONT_FORMATS[extension]}')"
+
+
+@functools.lru_cache(maxsize=None)
+def asset_styles(assets_dir: str = config.ASSETS_DIR, inline: bool = config.INLINE_ASSETS) -> Markup:
+    # @font-face rules for the bundled fonts, built once per process. An installed copy of the font is preferred,
+    # then the bundle; when neither exists the template's sans-serif fallback is used. Nothing is fetched remotely.
+    fonts = bundled_fonts(assets_dir)
+    rules = []
+    for weight in sorted(set(FONT_WEIGHTS) | set(fonts)):
+        sources = [f"local('{FONT_FAMILY}')"]
+        if weight in fonts:
+            sources.append(font_source(fonts[weight], inline))
+        rules.append(f"@font-face {{ font-family: '{FONT_FAMILY}'; font-weight: {weight}; src: {', '.join(sources)}; }}")
+    return Markup("\n".join(rules))
+
+
+def fetch_fonts(assets_dir: str = config.ASSETS_DIR) -> Dict[int, str]:
+    # One-off download of the font files into the bundle, run where there is network access and commit the result
+    os.makedirs(font_dir(assets_dir), exist_ok=True)
+    url = GOOGLE_FONTS_CSS.format(family=FONT_FAMILY, weights=";".join(map(str, FONT_WEIGHTS)))
+    request = urllib.request.Request(url, headers={"User-Agent": TTF_USER_AGENT})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        css = response.read().decode("utf-8")
+
+    fetched = {}
+    for block in re.findall(r"@font-face\s*{[^}]*}", css):
+        weight = re.search(r"font-weight:\s*(\d+)", block)
+        source = re.search(r"url\((https://[^)]+)\)", block)
+        if not weight or not source:
+            continue
+        extension = os.path.splitext(source.group(1).split("?")[0])[1] or ".ttf"
+        path = os.path.join(font_dir(assets_dir), f"{FONT_FAMILY}-{weight.group(1)}{extension}")
+        urllib.request.urlretrieve(source.group(1), path)
+        fetched[int(weight.group(1))] = path
+    asset_styles.cache_clear()
+    return fetched
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["fetch"]:
+        for weight, path in fetch_fonts().items():
+            print(f"{weight}: {path}")
+    else:
+        print("Usage: python assets.py fetch")
@@ -0,0 +1,230 @@
+import argparse
+import csv
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+import config
+from ai import Order, build_invoice_html
+from catalog import get_catalog
+from invoice_store import InvoiceStore, invoice_key
+from database import CompanyDBManager, make_database
+from logos import logo_uri
+from matcher import matcher_for
+from pdf_service import PdfBackend, make_backend
+from solver import solver_for
+from templates import get_registry
+from utils import extract_number_and_convert_to_float, write_bytes
+
+
+def read_orders(path: str) -> List[dict]:
+    # One order per CSV row or JSONL line, with the same fields as ai.Order.
+    # product_names may be a comma separated string; customer_detail lines are split on newlines or a literal "\n".
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in file if line.strip()]
+        else:
+            rows = list(csv.DictReader(file))
+
+    orders = []
+    for row in rows:
+        # Blank cells become None rather than disappearing, Order's optional fields have no default
+        row = {key: None if value == "" else value for key, value in row.items()}
+        if isinstance(row.get("product_names"), str):
+            row["product_names"] = [name.strip() for name in row["product_names"].split(",") if name.strip()]
+        orders.append(row)
+    return orders
+
+
+def resolve_jobs(db: CompanyDBManager, orders: Iterable[dict], store: InvoiceStore, issued_at: datetime) -> Tuple[List[dict], List[dict]]:
+    # Look up every company and payment once and reserve one block of invoice numbers per company, all in this
+    # process, so the workers only get plain picklable data. Orders that don't check out become failures in the manifest.
+    companies: Dict[str, object] = {}
+    payments: Dict[Tuple[str, str], Optional[dict]] = {}
+    jobs_by_company: Dict[str, List[dict]] = {}
+    failures = []
+
+    for line, row in enumerate(orders, start=1):
+        try:
+            order = Order(**row)
+        except ValidationError as error:
+            failures.append({"line": line, "company": row.get("company_name"), "error": f"Invalid order: {error}"})
+            continue
+
+        choice = order.payment_name_or_number or order.bank_name
+        if (order.company_name, choice) not in payments:
+            company, payment = db.get_order_context(order.company_name, choice)
+            companies[order.company_name] = company
+            payments[(order.company_name, choice)] = payment.to_dict() if payment else None
+        company = companies[order.company_name]
+        if company is None:
+            failures.append({"line": line, "company": order.company_name, "error": f"No company found with the name '{order.company_name}'"})
+            continue
+
+        if (payment_details := payments[(order.company_name, choice)]) is None:
+            failures.append({"line": line, "company": order.company_name, "error": f"No payment found with the name '{order.payment_name_or_number}' or '{order.bank_name}'"})
+            continue
+
+        total_amount = extract_number_and_convert_to_float(order.payment_amount)
+        if total_amount is None:
+            failures.append({"line": line, "company": order.company_name, "error": f"Invalid payment amount '{order.payment_amount}'"})
+            continue
+
+        try:
+            logo_path = logo_uri(company.logo)
+        except Exception as error:
+            failures.append({"line": line, "company": order.company_name, "error": f"Could not prepare logo: {type(error).__name__}: {error}"})
+            continue
+
+        jobs_by_company.setdefault(order.company_name, []).append({
+            "line": line,
+            "company": order.company_name,
+            "invoice": {
+                "customer_details": order.customer_detail.replace("\\n", "\n").split("\n"),
+                "payment_details": payment_details,
+                "logo_path": logo_path,
+                "product_names": order.product_names or None,
+                "total_amount": total_amount,
+                "company_info": company.to_dict(),
+            },
+        })
+
+    # Numbers are taken before anything renders, so a crash mid-batch leaves gaps rather than duplicates
+    jobs = []
+    for company_name, company_jobs in jobs_by_company.items():
+        for job, invoice_number in zip(company_jobs, db.reserve_invoice_numbers(company_name, len(company_jobs))):
+            job["invoice_number"] = job["invoice"]["invoice_number"] = invoice_number
+            job["key"] = invoice_key(company_name, invoice_number, issued_at)
+            job["path"] = store.path(job["key"])
+            jobs.append(job)
+    return jobs, failures
+
+
+_backend: Optional[PdfBackend] = None
+_store: Optional[InvoiceStore] = None
+_product_file_path = "products.xlsx"
+
+
+def _init_worker(product_file_path: str, backend: str, output_dir: str) -> None:
+    # Pay for loading the catalog, indexing it and compiling the templates once per worker, not per invoice
+    global _backend, _store, _product_file_path
+    _product_file_path = product_file_path
+    _store = InvoiceStore(output_dir)
+    price_index = get_catalog(product_file_path).price_index
+    matcher_for(price_index)
+    solver_for(price_index)
+    get_registry().warm()
+    _backend = make_backend(backend, workers=1)
+
+
+def render_job(job: dict) -> dict:
+    result = {"line": job["line"], "company": job["company"], "invoice_number": job["invoice_number"]}
+    try:
+        start = time.perf_counter()
+        html = build_invoice_html(**job["invoice"], product_file_path=_product_file_path)
+        rendered = time.perf_counter()
+        pdf = _backend.convert(html)
+        converted = time.perf_counter()
+        _store.put(job["key"], pdf)
+        written = time.perf_counter()
+    except Exception as error:
+        result["error"] = f"{type(error).__name__}: {error}"
+        result["traceback"] = traceback.format_exc()
+        return result
+
+    result.update({
+        "path": job["path"],
+        "amount": job["invoice"]["total_amount"],
+        "bytes": len(pdf),
+        "render_seconds": rendered - start,
+        "pdf_seconds": converted - rendered,
+        "write_seconds": written - converted,
+    })
+    return result
+
+
+def run_batch(
+    orders: Iterable[dict],
+    db: CompanyDBManager,
+    output_dir: str = config.INVOICE_DIR,
+    workers: int = os.cpu_count() or 1,
+    product_file_path: str = "products.xlsx",
+    backend: str = config.PDF_BACKEND,
+    manifest_path: Optional[str] = None,
+) -> dict:
+    # Product selection, HTML rendering and PDF conversion for every order, fanned out across a process pool.
+    # Returns the manifest, which is also written next to the invoices unless a path is given.
+    started_at = datetime.now()
+    start = time.perf_counter()
+    orders = list(orders)
+    os.makedirs(output_dir, exist_ok=True)
+    jobs, failures = resolve_jobs(db, orders, InvoiceStore(output_dir), started_at)
+
+    invoices = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(product_file_path, backend, output_dir)) as pool:
+            for future in as_completed([pool.submit(render_job, job) for job in jobs]):
+                result = future.result()
+                (failures if "error" in result else invoices).append(result)
+        # One bulk insert into the invoice registry rather than a round trip per PDF
+        db.add_invoices(
+            {
+                "company_name": entry["company"],
+                "number": entry["invoice_number"],
+                "amount": entry["amount"],
+                "created_at": started_at,
+                "path": entry["path"],
+                "size": entry["bytes"],
+            }
+            for entry in invoices
+        )
+
+    seconds = time.perf_counter() - start
+    manifest = {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "seconds": seconds,
+        "workers": workers,
+        "backend": backend,
+        "orders": len(orders),
+        "succeeded": len(invoices),
+        "failed": len(failures),
+        "invoices_per_hour": len(invoices) / seconds * 3600 if seconds else 0.0,
+        "invoices": sorted(invoices, key=lambda entry: entry["line"]),
+        "failures": sorted(failures, key=lambda entry: entry["line"]),
+    }
+    manifest_path = manifest_path or os.path.join(output_dir, f"batch_{started_at:%Y%m%d_%H%M%S}.json")
+    write_bytes(manifest_path, json.dumps(manifest, indent=2).encode("utf-8"))
+    manifest["manifest_path"] = manifest_path
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate invoices for every order in a CSV or JSONL file")
+    parser.add_argument("orders", help="CSV or .jsonl file with the ai.Order fields")
+    parser.add_argument("--output", default=config.INVOICE_DIR, help="invoice store root, the manifest goes at its top")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--database", default=config.DATABASE_URL, help="database URL or SQLite file")
+    parser.add_argument("--products", default="products.xlsx")
+    parser.add_argument("--backend", default=config.PDF_BACKEND)
+    parser.add_argument("--manifest", default=None)
+    args = parser.parse_args()
+
+    result = run_batch(
+        read_orders(args.orders),
+        CompanyDBManager(make_database(args.database)),
+        output_dir=args.output,
+        workers=args.workers,
+        product_file_path=args.products,
+        backend=args.backend,
+        manifest_path=args.manifest,
+    )
+    print(
+        f"{result['succeeded']} invoices, {result['failed']} failures in {result['seconds']:.1f}s "
+        f"({result['invoices_per_hour']:.0f}/hour). Manifest: {result['manifest_path']}"
+    )
@@ -0,0 +1,33 @@
+# How close the greedy pick and the exact-fit solver get to the invoice amount, and how long they take.
+# Run from the repository root: python -m benchmarks.amount_solver [products]
+import random
+import sys
+import time
+
+from ai import InvoiceGenerator
+from benchmarks.price_index import make_products_df
+from catalog import ProductCatalog
+
+
+def run(generator: InvoiceGenerator, total_amount: float, rounds: int = 20) -> None:
+    results = {}
+    for mode in ("greedy", "exact"):
+        generator.amount_solver = mode
+        random.seed(0)
+        gaps, times = [], []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            line_items = generator.generate_line_items(None, total_amount)
+            times.append(time.perf_counter() - start)
+            gaps.append(abs(total_amount - sum(item.amount for item in line_items)))
+        results[mode] = (sum(gaps) / rounds, max(times))
+    print(f"£{total_amount:>9.2f} | " + " | ".join(
+        f"{mode} mean gap £{gap:9.2f} max {seconds * 1000:7.1f} ms" for mode, (gap, seconds) in results.items()
+    ))
+
+
+if __name__ == "__main__":
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    generator = InvoiceGenerator("invoice.html", catalog=ProductCatalog("synthetic.xlsx", make_products_df(products)))
+    for amount in [83.33, 500, 2500, 12345.67, 83333.33]:
+        run(generator, amount)
@@ -0,0 +1,42 @@
+# Invoices per hour from batch.run_batch at different worker counts. Works on a copy of database.db so no invoice
+# numbers are used up. Run from the repository root: python -m benchmarks.batch [orders] [backend]
+import os
+import shutil
+import sys
+import tempfile
+
+import config
+from batch import run_batch
+from database import CompanyDBManager, SqliteDatabase
+
+
+def sample_orders(db: CompanyDBManager, count: int) -> list:
+    companies = [(payment.company.name, payment.bank_name) for payment in db.get_all_payments()]
+    return [
+        {
+            "customer_detail": f"Shop {number}\n1 High Street\nLondon",
+            "payment_amount": f"£{500 + number * 37 % 2000}",
+            "bank_name": companies[number % len(companies)][1],
+            "product_names": ["Elf Bar", "Lost Mary"] if number % 2 else [],
+            "company_name": companies[number % len(companies)][0],
+        }
+        for number in range(count)
+    ]
+
+
+def run(count: int, backend: str) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = os.path.join(directory, "database.db")
+        shutil.copy("database.db", database_path)
+        db = CompanyDBManager(SqliteDatabase(database_path))
+        orders = sample_orders(db, count)
+        for workers in sorted({1, 2, os.cpu_count() or 1}):
+            manifest = run_batch(orders, db, output_dir=os.path.join(directory, f"workers_{workers}"), workers=workers, backend=backend)
+            print(
+                f"{backend}, {workers:>2} workers: {manifest['succeeded']} invoices in {manifest['seconds']:6.1f}s, "
+                f"{manifest['invoices_per_hour']:8.0f}/hour, {manifest['failed']} failures"
+            )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50, sys.argv[2] if len(sys.argv) > 2 else config.PDF_BACKEND)
@@ -0,0 +1,60 @@
+# Loading N companies and N payments through import_companies/import_payments vs add_company/add_payment per row
+# (timed on a sample and extrapolated), then streaming them back out, on a temporary SQLite database.
+# Run from the repository root: python -m benchmarks.bulk_import [rows]
+import os
+import sys
+import tempfile
+import time
+
+from company_data import write_rows
+from database import CompanyDBManager, make_database
+
+
+def company_rows(count: int, prefix: str = "Bulk"):
+    for index in range(count):
+        yield {
+            "name": f"{prefix} Company {index}", "address1": f"{index} High Street", "address2": "", "city": "London",
+            "postcode": "E1 6AN", "country": "UK", "email": f"billing{index}@example.com", "company_number": str(index),
+            "vat_reg": "VAT Reg No", "vat_number": f"GB{index:09d}", "logo": "", "invoice_number": "AB-1",
+        }
+
+
+def payment_rows(count: int, prefix: str = "Bulk"):
+    for index in range(count):
+        yield {
+            "company": f"{prefix} Company {index}", "payment_name": "Main", "bank_name": "Tide",
+            "account_number": str(10000000 + index), "sort_code": "04-00-04", "bank_address": "1 Bank Street, London",
+        }
+
+
+def run(count: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        db = CompanyDBManager(make_database(os.path.join(directory, "database.db")))
+
+        sample = min(count, 500)
+        start = time.perf_counter()
+        for row, payment in zip(company_rows(sample, "Single"), payment_rows(sample, "Single")):
+            company = db.add_company(**{key: value or None for key, value in row.items()} | {"address2": "", "invoice_number": "AB-1"})
+            db.add_payment(company, payment["payment_name"], payment["bank_name"], int(payment["account_number"]), payment["sort_code"], payment["bank_address"])
+        single = (time.perf_counter() - start) / sample
+        print(f"add_company + add_payment: {single * 1000:6.2f} ms per row, ~{single * count:7.1f}s for {count}")
+
+        start = time.perf_counter()
+        db.import_companies(company_rows(count))
+        db.import_payments(payment_rows(count))
+        bulk = time.perf_counter() - start
+        print(f"import_companies + import_payments: {bulk:6.2f}s for {count} companies and {count} payments ({2 * count / bulk:8.0f} rows/s)")
+
+        start = time.perf_counter()
+        db.import_companies(company_rows(count))
+        db.import_payments(payment_rows(count))
+        print(f"re-import (all upserts): {time.perf_counter() - start:6.2f}s")
+
+        start = time.perf_counter()
+        exported = write_rows(os.path.join(directory, "companies.csv"), db.export_companies())
+        exported += write_rows(os.path.join(directory, "payments.jsonl"), db.export_payments())
+        print(f"export: {exported} rows in {time.perf_counter() - start:6.2f}s")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
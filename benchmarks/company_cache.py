@@ -0,0 +1,35 @@
+# The database calls one order makes (company_exists, get_payment_by_name_or_bank, get_order_context, to_dict and
+# reserve_invoice_numbers) with the CompanyDBManager cache on and off, on a copy of database.db.
+# Run from the repository root: python -m benchmarks.company_cache [orders]
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from database import CompanyDBManager, SqliteDatabase
+
+
+def run(orders: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = os.path.join(directory, "database.db")
+        shutil.copy("database.db", database_path)
+        for cache in (False, True):
+            db = CompanyDBManager(SqliteDatabase(database_path), cache=cache)
+            pairs = [(payment.company.name, payment.payment_name) for payment in db.get_all_payments()]
+            start = time.perf_counter()
+            for index in range(orders):
+                company_name, payment_name = pairs[index % len(pairs)]
+                db.company_exists(company_name)
+                db.get_payment_by_name_or_bank(company_name, payment_name)
+                company, payment = db.get_order_context(company_name, payment_name)
+                company.to_dict()
+                payment.to_dict()
+                db.reserve_invoice_numbers(company_name)
+            elapsed = time.perf_counter() - start
+            stats = db.cache_stats()
+            print(f"cache {'on ' if cache else 'off'}: {orders / elapsed:8.0f} orders/s, hit rate {stats['hit_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
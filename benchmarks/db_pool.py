@@ -0,0 +1,62 @@
+# Calls per second from concurrent reader threads (get_order_context) and writer threads (reserve_invoice_numbers)
+# with a plain SqliteDatabase vs make_database's pooled WAL setup, each on a fresh copy of database.db. Pass a
+# database URL to also run the pooled setup against a scratch Postgres database (needs psycopg2).
+# Run from the repository root: python -m benchmarks.db_pool [seconds] [readers] [writers] [postgres_url]
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from database import CompanyDBManager, SqliteDatabase, make_database
+
+
+def hammer(db: CompanyDBManager, seconds: float, readers: int, writers: int) -> tuple:
+    pairs = [(payment.company.name, payment.payment_name) for payment in db.get_all_payments()]
+    counts = [0] * (readers + writers)
+    errors = []
+    deadline = time.perf_counter() + seconds
+
+    def work(slot: int) -> None:
+        try:
+            while time.perf_counter() < deadline:
+                company_name, payment_name = pairs[counts[slot] % len(pairs)]
+                if slot < readers:
+                    db.get_order_context(company_name, payment_name)
+                else:
+                    db.reserve_invoice_numbers(company_name, 1)
+                counts[slot] += 1
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=work, args=(slot,)) for slot in range(readers + writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts[:readers]) / seconds, sum(counts[readers:]) / seconds, errors
+
+
+def run(seconds: float, readers: int, writers: int, postgres_url: str = None) -> None:
+    setups = [("plain sqlite", lambda path: SqliteDatabase(path, check_same_thread=False)), ("pooled sqlite WAL", make_database)]
+    for label, factory in setups:
+        with tempfile.TemporaryDirectory() as directory:
+            database_path = os.path.join(directory, "database.db")
+            shutil.copy("database.db", database_path)
+            db = CompanyDBManager(factory(database_path), cache=False)
+            reads, writes, errors = hammer(db, seconds, readers, writers)
+            if hasattr(db.db, "close_all"):
+                db.db.close_all()
+        print(f"{label:>18}: {reads:8.0f} reads/s, {writes:6.0f} writes/s, {len(errors)} errors {errors[:1]}")
+    if postgres_url:
+        db = CompanyDBManager(make_database(postgres_url), cache=False)
+        reads, writes, errors = hammer(db, seconds, readers, writers)
+        print(f"{'pooled postgres':>18}: {reads:8.0f} reads/s, {writes:6.0f} writes/s, {len(errors)} errors {errors[:1]}")
+    else:
+        print("No Postgres URL given, skipping Postgres")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run(float(args[0]) if args else 5, int(args[1]) if len(args) > 1 else 4, int(args[2]) if len(args) > 2 else 2, args[3] if len(args) > 3 else None)
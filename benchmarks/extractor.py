@@ -0,0 +1,40 @@
+# Cold and warm extraction latency: a new OrderExtractor per message (old handler) vs the shared async extractor.
+# Calls the OpenAI API with config.OPENAI_API_KEY. Run from the repository root: python -m benchmarks.extractor [calls]
+import asyncio
+import sys
+import time
+
+import config
+from ai import OrderExtractor, get_order_extractor
+
+ORDER = "John Doe, 123 Main St, London\n£1000\nTide\nPayment 1\nElf Bar 600, Lost Mary\nXYZ Ltd"
+
+
+def per_message(calls: int) -> list:
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        OrderExtractor(openai_api_key=config.OPENAI_API_KEY).extract_order(ORDER)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def shared(calls: int) -> list:
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await get_order_extractor().aextract_order(ORDER)
+        timings.append(time.perf_counter() - start)
+    await get_order_extractor().aclose()
+    return timings
+
+
+def report(name: str, timings: list) -> None:
+    warm = timings[1:] or timings
+    print(f"{name:>12}: cold {timings[0] * 1000:7.0f} ms | warm mean {sum(warm) / len(warm) * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    report("per message", per_message(calls))
+    report("shared", asyncio.run(shared(calls)))
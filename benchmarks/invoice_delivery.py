@@ -0,0 +1,58 @@
+# Critical-path time between a rendered PDF and the upload starting: write to invoices/ then reopen and read
+# the file (before) vs handing the bytes to Telegram in a buffer and archiving in the background (after).
+# Run from the repository root: python -m benchmarks.invoice_delivery [invoices]
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+from utils import write_bytes
+
+
+def legacy_write(path: str, pdf: bytes) -> None:
+    with open(path, "wb") as file:
+        file.write(pdf)
+
+
+async def upload(file) -> int:
+    # Stand-in for send_document: the upload starts by reading the document
+    return len(file.read())
+
+
+async def file_path(directory: str, pdf: bytes, invoices: int) -> float:
+    start = time.perf_counter()
+    for number in range(invoices):
+        path = os.path.join(directory, f"legacy_{number}.pdf")
+        await asyncio.to_thread(legacy_write, path, pdf)
+        with open(path, "rb") as file:
+            await upload(file)
+    return time.perf_counter() - start
+
+
+async def in_memory(directory: str, pdf: bytes, invoices: int) -> tuple:
+    archive = []
+    start = time.perf_counter()
+    for number in range(invoices):
+        archive.append(asyncio.create_task(asyncio.to_thread(write_bytes, os.path.join(directory, f"memory_{number}.pdf"), pdf)))
+        await upload(BytesIO(pdf))
+    critical = time.perf_counter() - start
+    await asyncio.gather(*archive)
+    return critical, time.perf_counter() - start
+
+
+async def run(invoices: int) -> None:
+    with open("generated.pdf", "rb") as file:
+        pdf = file.read()
+    with tempfile.TemporaryDirectory(dir=".") as directory:
+        legacy = await file_path(directory, pdf, invoices)
+        critical, total = await in_memory(directory, pdf, invoices)
+    print(f"{invoices} invoices of {len(pdf) / 1024:.1f} KiB")
+    print(f"write + reopen: {legacy / invoices * 1000:7.3f} ms per invoice before the upload")
+    print(f"in-memory:      {critical / invoices * 1000:7.3f} ms per invoice before the upload "
+          f"(archive finished after {total / invoices * 1000:.3f} ms per invoice, fsync + rename included)")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,44 @@
+# Concurrent reserve_invoice_numbers calls from several processes on a copy of database.db: checks that no number
+# is handed out twice and reports reservations per second.
+# Run from the repository root: python -m benchmarks.invoice_numbers [processes] [calls] [block]
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from database import CompanyDBManager, SqliteDatabase
+
+
+def reserve(database_path: str, company_name: str, calls: int, block: int) -> list:
+    db = CompanyDBManager(SqliteDatabase(database_path))
+    numbers = []
+    for _ in range(calls):
+        numbers.extend(db.reserve_invoice_numbers(company_name, block))
+    return numbers
+
+
+def run(processes: int, calls: int, block: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = os.path.join(directory, "database.db")
+        shutil.copy("database.db", database_path)
+        company_name = CompanyDBManager(SqliteDatabase(database_path)).get_all_company_names()[0].name
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(reserve, *zip(*[(database_path, company_name, calls, block)] * processes)))
+        elapsed = time.perf_counter() - start
+
+    numbers = [number for result in results for number in result]
+    duplicates = sum(count - 1 for count in Counter(numbers).values() if count > 1)
+    print(
+        f"{processes} processes x {calls} reservations of {block}: {len(numbers)} numbers, {duplicates} duplicates, "
+        f"{processes * calls / elapsed:.0f} reservations/s"
+    )
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    run(*(args + [8, 100, 5][len(args):]))
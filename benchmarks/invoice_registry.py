@@ -0,0 +1,43 @@
+# Listing invoices by scanning a directory vs one page from the indexed registry, on a temporary directory and database.
+# Run from the repository root: python -m benchmarks.invoice_registry [files]
+import os
+import sys
+import tempfile
+import time
+
+from database import CompanyDBManager, SqliteDatabase
+
+
+def run(files: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        invoice_dir = os.path.join(directory, "invoices")
+        os.makedirs(invoice_dir)
+        for index in range(files):
+            with open(os.path.join(invoice_dir, f"Company {index % 50}_AB-{index}.pdf"), "wb") as file:
+                file.write(b"%PDF-1.4\n")
+
+        db = CompanyDBManager(SqliteDatabase(os.path.join(directory, "database.db")))
+        start = time.perf_counter()
+        db.import_invoice_files(invoice_dir)
+        print(f"import {files} files: {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        names = sorted(os.path.splitext(name)[0] for name in os.listdir(invoice_dir))
+        scan = time.perf_counter() - start
+        print(f"listdir + sort: {scan * 1000:8.2f} ms, {len(names)} names, {sum(map(len, names)) + len(names)} chars")
+
+        for label, company_name in (("all companies", None), ("one company", "Company 7")):
+            start = time.perf_counter()
+            page = db.list_invoices(company_name, page=3)
+            total = db.count_invoices(company_name)
+            elapsed = time.perf_counter() - start
+            print(f"registry page, {label}: {elapsed * 1000:8.2f} ms, {len(page)} of {total}")
+
+        start = time.perf_counter()
+        for index in range(0, files, max(files // 1000, 1)):
+            db.get_invoice(f"Company {index % 50}_AB-{index}")
+        print(f"registry get_invoice: {(time.perf_counter() - start) / min(files, 1000) * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,59 @@
+# Writes, existence checks and directory listings for N invoices in one flat directory vs the sharded InvoiceStore,
+# in a temporary directory. Run from the repository root: python -m benchmarks.invoice_store [invoices]
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from invoice_store import InvoiceStore, invoice_key
+from utils import write_bytes
+
+PDF = b"%PDF-1.4\n" + b"0" * 2048
+
+
+def orders(count: int):
+    # 200 companies over two years
+    for index in range(count):
+        yield f"Company {index % 200} Ltd", f"AB-{index}", datetime(2024 + index % 2, index % 12 + 1, 1)
+
+
+def run(count: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        flat_dir = os.path.join(directory, "flat")
+        os.makedirs(flat_dir)
+        store = InvoiceStore(os.path.join(directory, "sharded"))
+
+        start = time.perf_counter()
+        for company_name, number, _ in orders(count):
+            write_bytes(os.path.join(flat_dir, f"{company_name}_{number}.pdf"), PDF)
+        flat_write = time.perf_counter() - start
+        start = time.perf_counter()
+        for company_name, number, created_at in orders(count):
+            store.put(invoice_key(company_name, number, created_at), PDF)
+        sharded_write = time.perf_counter() - start
+        print(f"write:  flat {count / flat_write:8.0f}/s, sharded {count / sharded_write:8.0f}/s")
+
+        sample = list(orders(count))[:: max(count // 2000, 1)]
+        start = time.perf_counter()
+        for company_name, number, _ in sample:
+            os.path.exists(os.path.join(flat_dir, f"{company_name}_{number}.pdf"))
+        flat_exists = time.perf_counter() - start
+        start = time.perf_counter()
+        for company_name, number, created_at in sample:
+            store.exists(invoice_key(company_name, number, created_at))
+        sharded_exists = time.perf_counter() - start
+        print(f"exists: flat {flat_exists / len(sample) * 1e6:8.1f} us, sharded {sharded_exists / len(sample) * 1e6:8.1f} us")
+
+        start = time.perf_counter()
+        flat_names = os.listdir(flat_dir)
+        flat_list = time.perf_counter() - start
+        shard = os.path.dirname(store.path(invoice_key("Company 7 Ltd", "AB-7", datetime(2025, 8, 1))))
+        start = time.perf_counter()
+        shard_names = os.listdir(shard)
+        shard_list = time.perf_counter() - start
+        print(f"listdir: flat {flat_list * 1000:8.2f} ms ({len(flat_names)} entries), one shard {shard_list * 1000:8.3f} ms ({len(shard_names)} entries)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,89 @@
+# Per-invoice CPU time and allocations of the old pd.concat/iterrows table builder vs LineItem records.
+# Run from the repository root: python -m benchmarks.line_items [amount ...]
+import random
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from ai import InvoiceGenerator
+from benchmarks.price_index import make_products_df
+from catalog import ProductCatalog
+
+
+def legacy_invoice_table(generator: InvoiceGenerator, total_amount: float) -> str:
+    # generate_invoice_products + render_invoice_table as they were before LineItem, minus the HTML styling
+    price_index = generator.catalog.price_index
+    available_rows = list(range(len(price_index)))
+    selected_products_df = pd.DataFrame(columns=['DESCRIPTION', 'QUANTITY', 'UNIT PRICE (£)', 'AMOUNT (£)'])
+    selected_rows = []
+    total_cost = 0.0
+    for _ in range(random.randint(7, 20)):
+        position = random.randrange(len(available_rows))
+        row_id = available_rows[position]
+        product_price = price_index.best_price(row_id)
+        if total_cost + 10 * product_price <= total_amount:
+            selected_products_df = pd.concat([selected_products_df, pd.DataFrame([{
+                'DESCRIPTION': price_index.descriptions[row_id], 'QUANTITY': 10,
+                'UNIT PRICE (£)': round(product_price, 2), 'AMOUNT (£)': round(10 * product_price, 2),
+            }])], ignore_index=True)
+            selected_rows.append(row_id)
+            total_cost += 10 * product_price
+            available_rows.pop(position)
+    while total_cost + 30 < total_amount and len(selected_products_df) > 0:
+        increased = False
+        for i, row in selected_products_df.iterrows():
+            if row['QUANTITY'] >= 30:
+                continue
+            quantity = (row['QUANTITY'] + 10) * 10
+            product_price = price_index.price_at(selected_rows[i], quantity)
+            product_cost = quantity * product_price
+            if total_cost - row['AMOUNT (£)'] + product_cost > total_amount - 30:
+                continue
+            selected_products_df.loc[i, 'QUANTITY'] += 10
+            selected_products_df.loc[i, 'UNIT PRICE (£)'] = round(product_price, 2)
+            selected_products_df.loc[i, 'AMOUNT (£)'] = round(product_cost, 2)
+            total_cost = total_cost - row['AMOUNT (£)'] + product_cost
+            increased = True
+            break
+        if not increased:
+            break
+    delivery = min(30, round(max(0, total_amount - total_cost), 2))
+    selected_products_df = pd.concat([selected_products_df, pd.DataFrame([{
+        'DESCRIPTION': 'Delivery', 'QUANTITY': 1, 'UNIT PRICE (£)': delivery, 'AMOUNT (£)': delivery,
+    }])], ignore_index=True)
+    return "".join(f"{row['DESCRIPTION']}{row['QUANTITY']}{row['UNIT PRICE (£)']}{row['AMOUNT (£)']}" for _, row in selected_products_df.iterrows())
+
+
+def new_invoice_table(generator: InvoiceGenerator, total_amount: float) -> str:
+    line_items = generator.greedy_line_items(generator.match_product_rows(None), total_amount)
+    return "".join(f"{row.description}{row.quantity}{row.unit_price}{row.amount}" for row in line_items)
+
+
+def measure(builder, generator: InvoiceGenerator, total_amount: float, rounds: int):
+    random.seed(0)
+    start = time.process_time()
+    for _ in range(rounds):
+        builder(generator, total_amount)
+    cpu = (time.process_time() - start) / rounds
+
+    random.seed(0)
+    tracemalloc.start()
+    builder(generator, total_amount)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak
+
+
+def run(total_amount: float, rounds: int = 20) -> None:
+    generator = InvoiceGenerator("invoice.html", catalog=ProductCatalog("synthetic.xlsx", make_products_df(1000)))
+    old_cpu, old_peak = measure(legacy_invoice_table, generator, total_amount, rounds)
+    new_cpu, new_peak = measure(new_invoice_table, generator, total_amount, rounds)
+    print(f"£{total_amount:>8.0f} | dataframe {old_cpu * 1000:8.2f} ms {old_peak / 1024:8.1f} KiB | "
+          f"line items {new_cpu * 1000:6.3f} ms {new_peak / 1024:6.1f} KiB | {old_cpu / new_cpu:6.0f}x cpu")
+
+
+if __name__ == "__main__":
+    for amount in map(float, sys.argv[1:] or [200, 1000, 5000, 20000]):
+        run(amount)
@@ -0,0 +1,75 @@
+# Logo file size and PDF size/render time with the uploaded logos vs their normalized variants.
+# PDF timings need wkhtmltopdf on PATH. Run from the repository root: python -m benchmarks.logo_variants [rounds]
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+from ai import InvoiceGenerator
+from catalog import get_catalog
+from logos import LogoVariants
+from pdf_service import PdfRenderService
+
+
+def phone_photo(directory: str) -> str:
+    # Stand-in for a full-size phone JPEG: 4032x3024 of noise-free gradient with EXIF attached
+    path = os.path.join(directory, "phone.jpg")
+    image = Image.linear_gradient("L").resize((4032, 3024)).convert("RGB")
+    exif = Image.Exif()
+    exif[0x010F] = "Phone maker"
+    image.save(path, "JPEG", quality=95, exif=exif)
+    return path
+
+
+def html_with_logo(path: str) -> str:
+    return (
+        InvoiceGenerator("invoice.html", catalog=get_catalog("products.xlsx"))
+        .render_customer_details(["Google Ltd", "123 Road", "London", "L28 je83"])
+        .render_payment_details("Xyz Ltd", "Tide", "23-89-62", "73738282", "123 Road, London, JY71 1KL")
+        .render_invoice_details("ABC123")
+        .render_company_logo(f"file://{os.path.abspath(path)}", 200, 160)
+        .render_invoice_table(None, 2000)
+        .get_rendered_html()
+    )
+
+
+def run(rounds: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        sources = sorted(os.path.join("logos", name) for name in os.listdir("logos") if name.endswith((".jpg", ".png")))
+        sources.append(phone_photo(directory))
+        variants = LogoVariants(variant_dir=os.path.join(directory, "variants"))
+
+        pairs = []
+        for source in sources:
+            start = time.perf_counter()
+            variant = variants.get(source)
+            built = time.perf_counter() - start
+            start = time.perf_counter()
+            variants.get(source)
+            cached = time.perf_counter() - start
+            pairs.append((source, variant))
+            print(
+                f"{os.path.basename(source):>45}: {os.path.getsize(source) / 1024:8.1f} KiB -> {os.path.getsize(variant) / 1024:6.1f} KiB"
+                f"  (build {built * 1000:6.1f} ms, cached lookup {cached * 1e6:5.1f} us)"
+            )
+
+        if shutil.which("wkhtmltopdf") is None:
+            print("wkhtmltopdf not found, skipping PDF timings")
+            return
+        service = PdfRenderService(workers=1, timeout=120)
+        for source, variant in pairs:
+            for name, path in (("original", source), ("variant", variant)):
+                html = html_with_logo(path)
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    pdf = service.render_sync(html)
+                elapsed = (time.perf_counter() - start) / rounds
+                print(f"{os.path.basename(source):>45} {name:>8}: {elapsed * 1000:7.0f} ms, PDF {len(pdf) / 1024:7.1f} KiB")
+        service.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,54 @@
+# Per-order match latency of process.extractOne over the unique product names vs the indexed ProductMatcher.
+# Run from the repository root: python -m benchmarks.matcher [skus ...]
+import random
+import sys
+import time
+
+import pandas as pd
+from fuzzywuzzy import process
+
+from catalog import PriceIndex
+from matcher import ProductMatcher
+
+WORDS = ["Elf", "Bar", "Lost", "Mary", "Crystal", "SKE", "Geek", "Vape", "Pod", "Max", "Pro", "Ultra", "Nano", "Puff"]
+FLAVOURS = ["Mango", "Blueberry", "Cola", "Grape", "Watermelon Ice", "Cherry", "Pink Lemonade", "Strawberry Kiwi", "Peach Ice", "Cotton Candy"]
+
+
+def make_catalog(skus: int) -> pd.DataFrame:
+    rng = random.Random(0)
+    products = [f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.randint(100, 9999)}" for _ in range(skus // len(FLAVOURS))]
+    rows = [{'Product': product, 'Flavour': flavour, 'Price': 2.5} for product in products for flavour in FLAVOURS]
+    return pd.DataFrame(rows)
+
+
+def run(skus: int, orders: int = 5) -> None:
+    products_df = make_catalog(skus)
+    start = time.perf_counter()
+    matcher = ProductMatcher(PriceIndex(products_df))
+    build = time.perf_counter() - start
+
+    rng = random.Random(1)
+    queries = [[f"{name.lower()} {rng.choice(FLAVOURS)}" for name in rng.sample(list(products_df['Product'].unique()), 5)] for _ in range(orders)]
+
+    start = time.perf_counter()
+    for names in queries:
+        [process.extractOne(name, products_df['Product'].unique()) for name in names]
+    old = (time.perf_counter() - start) / orders
+
+    start = time.perf_counter()
+    for names in queries:
+        matcher.match_many(names)
+    cold = (time.perf_counter() - start) / orders
+
+    start = time.perf_counter()
+    for names in queries:
+        matcher.match_many(names)
+    warm = (time.perf_counter() - start) / orders
+
+    print(f"{len(products_df):>7} skus | build {build:6.2f} s | extractOne {old * 1000:9.1f} ms/order | "
+          f"matcher {cold * 1000:6.1f} ms/order, memoized {warm * 1000:5.2f} ms/order")
+
+
+if __name__ == "__main__":
+    for n in map(int, sys.argv[1:] or [1000, 10000, 100000]):
+        run(n)
@@ -0,0 +1,37 @@
+# PDF render latency of the invoice with the old Google Fonts <link> vs the local asset bundle.
+# Also lists the fonts embedded in each PDF, to check the bundle renders in Inter rather than the fallback.
+# Uses the configured backend (INVOICE_PDF_BACKEND); run once with and once without network access to compare.
+# Run from the repository root: python -m benchmarks.offline_assets [rounds]
+import re
+import sys
+import time
+
+from benchmarks.pdf_service import sample_html
+from pdf_service import FONT_FACE, PdfRenderService
+
+GOOGLE_FONTS_LINK = '<link href="https://fonts.googleapis.com/css2?family=Inter:wght@100;200;300;400;500;600;700;800;900&display=swap" rel="stylesheet">'
+
+
+def embedded_fonts(pdf: bytes) -> str:
+    # Subset fonts are named ABCDEF+Family-Style, the prefix is dropped
+    names = {name.split(b"+")[-1].decode("ascii", "replace") for name in re.findall(rb"/BaseFont\s*/([^\s/<>\[\]()]+)", pdf)}
+    return ", ".join(sorted(names)) or "none"
+
+
+def run(rounds: int) -> None:
+    html = sample_html()
+    # The old markup: the <link> and none of the bundle's @font-face rules
+    remote_html = FONT_FACE.sub("", html).replace("<style type=\"text/css\">", GOOGLE_FONTS_LINK + "\n\t<style type=\"text/css\">", 1)
+    service = PdfRenderService(workers=1, timeout=120)
+    for name, document in (("google fonts", remote_html), ("local bundle", html)):
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            pdf = service.render_sync(document)
+            timings.append(time.perf_counter() - start)
+        print(f"{name}: mean {sum(timings) / rounds * 1000:7.0f} ms, max {max(timings) * 1000:7.0f} ms, fonts {embedded_fonts(pdf)}")
+    service.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,77 @@
+# get_payment_by_name_or_bank latency (cache off) on a temporary SQLite database with N companies and M payments,
+# without and with the (company_id, bank_name) index from migration 1. Company 0 also holds 5% of the payments,
+# which is where scanning a company's rows hurts.
+# Run from the repository root: python -m benchmarks.payment_lookup [companies] [payments]
+import os
+import random
+import sys
+import tempfile
+import time
+
+from database import CompanyDBManager, make_database
+
+BANKS = ["Tide", "HSBC", "Barclays", "Lloyds", "NatWest", "Monzo", "Starling", "Santander", "Metro", "Revolut"]
+
+
+def companies(count: int):
+    for index in range(count):
+        yield {
+            "name": f"Company {index}", "address1": "1 Road", "city": "London", "postcode": "E1", "country": "UK",
+            "email": "a@b.c", "company_number": index, "vat_reg": "VAT", "vat_number": f"GB{index}", "invoice_number": "AB-1",
+        }
+
+
+def payments(companies: int, count: int, big_share: float = 0.05):
+    big = int(count * big_share)
+    for index in range(count - big):
+        company = index % companies
+        yield {"company": f"Company {company}", "payment_name": f"Account {index}", "bank_name": f"{BANKS[index // companies % len(BANKS)]} {index // companies}",
+               "account_number": index, "sort_code": "00-00-00", "bank_address": "1 Bank St"}
+    for index in range(big):
+        yield {"company": "Company 0", "payment_name": f"Big account {index}", "bank_name": f"Big bank {index}",
+               "account_number": index, "sort_code": "00-00-00", "bank_address": "1 Bank St"}
+
+
+def plan(db: CompanyDBManager) -> str:
+    payment = db.payment_model
+    query = payment.select(payment, db.company_model).join(db.company_model).where(payment.id == db._payment_match("Company 0", "x"))
+    sql, params = query.sql()
+    return "; ".join(row[3] for row in db.db.execute_sql("EXPLAIN QUERY PLAN " + sql, params).fetchall())
+
+
+def measure(db: CompanyDBManager, label: str, company_count: int, big: int, lookups: int) -> None:
+    random.seed(1)
+    cases = {
+        "typical, by bank": [(f"Company {random.randrange(1, company_count)}", "Tide 0") for _ in range(lookups)],
+        "typical, by name": [(f"Company {index}", f"Account {index}") for index in random.sample(range(1, company_count), lookups)],
+        "big company, by bank": [("Company 0", f"Big bank {random.randrange(big)}") for _ in range(lookups)],
+        "big company, by name": [("Company 0", f"Big account {random.randrange(big)}") for _ in range(lookups)],
+        "missing": [(f"Company {random.randrange(company_count)}", "No such bank") for _ in range(lookups)],
+    }
+    print(f"{label}: {plan(db)}")
+    for name, keys in cases.items():
+        start = time.perf_counter()
+        for company_name, key in keys:
+            db.get_payment_by_name_or_bank(company_name, key)
+        print(f"    {name:>22}: {(time.perf_counter() - start) / lookups * 1e6:9.1f} us")
+
+
+def run(company_count: int, payment_count: int, lookups: int = 300) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        db = CompanyDBManager(make_database(os.path.join(directory, "database.db")), cache=False, migrate=False)
+        start = time.perf_counter()
+        db.import_companies(companies(company_count), batch_size=2000)
+        db.import_payments(payments(company_count, payment_count), batch_size=2000)
+        print(f"loaded {company_count} companies, {payment_count} payments in {time.perf_counter() - start:.0f}s")
+
+        big = int(payment_count * 0.05)
+        db.db.execute_sql('DROP INDEX IF EXISTS "payment_company_id_bank_name"')
+        measure(db, "without index", company_count, big, lookups)
+        start = time.perf_counter()
+        print(f"migration applied {db.migrate()} in {time.perf_counter() - start:.1f}s")
+        measure(db, "with index", company_count, big, lookups)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run(*(args + [100000, 1000000][len(args):]))
@@ -0,0 +1,52 @@
+# Throughput, p99 latency and output size of each PDF backend rendering the same invoice through PdfRenderService.
+# Backends that aren't installed are skipped. Run from the repository root: python -m benchmarks.pdf_backends [invoices]
+import asyncio
+import importlib.util
+import os
+import shutil
+import sys
+import time
+
+from benchmarks.pdf_service import sample_html
+from pdf_service import IN_PROCESS_CONVERTERS, PdfRenderService, RenderError
+
+
+def available_backends() -> list:
+    backends = ["wkhtmltopdf"] if shutil.which("wkhtmltopdf") else []
+    return backends + [name for name in IN_PROCESS_CONVERTERS if importlib.util.find_spec(name) is not None]
+
+
+async def timed(service: PdfRenderService, html: str) -> tuple:
+    start = time.perf_counter()
+    pdf = await service.render(html)
+    return time.perf_counter() - start, len(pdf)
+
+
+async def run(invoices: int) -> None:
+    html = sample_html()
+    workers = os.cpu_count() or 1
+    for backend in available_backends():
+        service = PdfRenderService(workers=workers, queue_limit=invoices, timeout=300, backend=backend)
+        # The first render pays for worker start-up and imports, keep it out of the numbers
+        try:
+            await service.render(html)
+        except RenderError as error:
+            service.close()
+            print(f"{backend:>12}: skipped, {error}")
+            continue
+        start = time.perf_counter()
+        results = await asyncio.gather(*[timed(service, html) for _ in range(invoices)])
+        elapsed = time.perf_counter() - start
+        service.close()
+
+        latencies = sorted(latency for latency, _ in results)
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(
+            f"{backend:>12}, {workers} workers: {invoices / elapsed:6.1f} PDFs/s, "
+            f"p50 {p50 * 1000:6.0f} ms, p99 {p99 * 1000:6.0f} ms, {results[0][1] / 1024:6.1f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 32))
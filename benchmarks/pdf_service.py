@@ -0,0 +1,36 @@
+# Wall time for rendering N invoices one after another vs concurrently through PdfRenderService.
+# Needs wkhtmltopdf on PATH. Run from the repository root: python -m benchmarks.pdf_service [invoices]
+import asyncio
+import os
+import sys
+import time
+
+from ai import InvoiceGenerator
+from catalog import get_catalog
+from pdf_service import PdfRenderService
+
+
+def sample_html() -> str:
+    return (
+        InvoiceGenerator("invoice.html", catalog=get_catalog("products.xlsx"))
+        .render_customer_details(["Google Ltd", "123 Road", "London", "L28 je83"])
+        .render_payment_details("Xyz Ltd", "Tide", "23-89-62", "73738282", "123 Road, London, JY71 1KL")
+        .render_invoice_details("ABC123")
+        .render_invoice_table(None, 2000)
+        .get_rendered_html()
+    )
+
+
+async def run(invoices: int) -> None:
+    html = sample_html()
+    for workers in sorted({1, os.cpu_count() or 1}):
+        service = PdfRenderService(workers=workers, queue_limit=invoices)
+        start = time.perf_counter()
+        await asyncio.gather(*[service.render(html) for _ in range(invoices)])
+        elapsed = time.perf_counter() - start
+        service.close()
+        print(f"{invoices} invoices, {workers:>2} workers: {elapsed:6.2f} s ({invoices / elapsed:5.1f} PDFs/s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 16))
@@ -0,0 +1,64 @@
+# Compares the old per-pick DataFrame filtering against catalog.PriceIndex lookups.
+# Run from the repository root: python -m benchmarks.price_index [products ...]
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from catalog import PriceIndex
+
+
+TIERS = [1000, 2000, 3000, 4000, 5000]
+
+
+def make_products_df(n_products: int, flavours_per_product: int = 10) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    rows = []
+    for p in range(n_products // flavours_per_product):
+        for f in range(flavours_per_product):
+            base = round(float(rng.uniform(1, 5)), 2)
+            row = {'Product': f"Product {p}", 'Flavour': f"Flavour {f}", 'Price': base}
+            row.update({tier: round(base - 0.1 * k, 2) for k, tier in enumerate(TIERS)})
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def dataframe_lookup(products_df: pd.DataFrame, product: str, flavour: str, quantity: int) -> float:
+    # The lookup generate_invoice_products used to do for every escalation step
+    product_df = products_df[(products_df['Product'] == product) & (products_df['Flavour'] == flavour)]
+    if str(quantity) in map(str, product_df.columns):
+        return product_df.loc[product_df.index[0], quantity]
+    available_quantities = [int(qty) for qty in map(str, product_df.columns) if qty.isdigit() and int(qty) < quantity]
+    if not available_quantities:
+        return product_df.loc[product_df.index[0], 'Price']
+    return product_df.loc[product_df.index[0], max(available_quantities)]
+
+
+def run(n_products: int, lookups: int = 200) -> None:
+    products_df = make_products_df(n_products)
+    start = time.perf_counter()
+    price_index = PriceIndex(products_df)
+    build = time.perf_counter() - start
+
+    random.seed(0)
+    queries = [(random.randrange(len(products_df)), random.choice([500, 1000, 2500, 4000, 6000])) for _ in range(lookups)]
+
+    start = time.perf_counter()
+    for row, quantity in queries:
+        dataframe_lookup(products_df, price_index.products[row], price_index.flavours[row], quantity)
+    old = (time.perf_counter() - start) / lookups
+
+    start = time.perf_counter()
+    for row, quantity in queries:
+        price_index.price_at(row, quantity)
+    new = (time.perf_counter() - start) / lookups
+
+    print(f"{len(products_df):>8} rows | index build {build * 1000:8.2f} ms | "
+          f"dataframe {old * 1e6:10.1f} us/lookup | index {new * 1e6:6.2f} us/lookup | {old / new:8.0f}x")
+
+
+if __name__ == "__main__":
+    for n in map(int, sys.argv[1:] or [100, 1000, 10000, 100000]):
+        run(n)
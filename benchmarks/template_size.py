@@ -0,0 +1,62 @@
+# HTML size and PDF render time of the invoice table built by the old inline-styled f-strings vs the template macros.
+# PDF timings need wkhtmltopdf on PATH. Run from the repository root: python -m benchmarks.template_size [lines ...]
+import shutil
+import sys
+import time
+
+from ai import InvoiceGenerator, LineItem
+from catalog import get_catalog
+from pdf_service import PdfRenderService
+
+CELL = "font-size: 14px;color: #000;font-family: arial;text-align: {align};line-height: 20px; padding: 10px 15px;{extra}"
+
+
+def legacy_rows(line_items) -> str:
+    rows = []
+    for item in line_items:
+        extra = " border-top: 2px solid #797778;" if item.is_delivery else ""
+        wrap = (lambda value: f"<strong>{value}</strong>") if item.is_delivery else (lambda value: value)
+        cells = "".join(
+            f'\n                    <td style="{CELL.format(align=align, extra=extra)}">\n                        {wrap(value)}\n                    </td>'
+            for align, value in (("left", item.description), ("right", item.quantity), ("right", item.unit_price), ("right", item.amount))
+        )
+        rows.append(f"\n                <tr>{cells}\n                </tr>\n                ")
+    return "\n".join(rows)
+
+
+def invoice(lines: int) -> InvoiceGenerator:
+    line_items = [LineItem(f"Elf Bar 600 - Flavour {i}", 10, 2.1, 21.0, i) for i in range(lines - 1)]
+    line_items.append(LineItem("Delivery", 1, 12.5, 12.5))
+    generator = (
+        InvoiceGenerator("invoice.html", catalog=get_catalog("products.xlsx"))
+        .render_customer_details(["Google Ltd", "123 Road", "London", "L28 je83"])
+        .render_payment_details("Xyz Ltd", "Tide", "23-89-62", "73738282", "123 Road, London, JY71 1KL")
+        .render_invoice_details("ABC123")
+    )
+    generator.line_items = generator.context['line_items'] = line_items
+    return generator
+
+
+def run(lines: int, service: PdfRenderService = None) -> None:
+    generator = invoice(lines)
+    html = generator.get_rendered_html()
+    macro_rows = "".join(str(generator.template.module.line_item_row(item)) for item in generator.line_items)
+    old_html = html.replace(macro_rows, legacy_rows(generator.line_items))
+
+    result = f"{lines:>5} lines | html {len(old_html.encode()) / 1024:8.1f} KiB -> {len(html.encode()) / 1024:7.1f} KiB"
+    if service is not None:
+        timings = []
+        for document in (old_html, html):
+            start = time.perf_counter()
+            service.render_sync(document)
+            timings.append(time.perf_counter() - start)
+        result += f" | pdf {timings[0] * 1000:7.0f} ms -> {timings[1] * 1000:7.0f} ms"
+    print(result)
+
+
+if __name__ == "__main__":
+    service = PdfRenderService(workers=1) if shutil.which("wkhtmltopdf") else None
+    for n in map(int, sys.argv[1:] or [10, 100, 1000]):
+        run(n, service)
+    if service is not None:
+        service.close()
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def read_product_file(file_path: str) -> pd.DataFrame:
+    file_extension = file_path.split('.')[-1]
+    if file_extension == 'csv':
+        return pd.read_csv(file_path)
+    elif file_extension == 'xlsx':
+        return pd.read_excel(file_path)
+    else:
+        raise ValueError(f"Unsupported file type: {file_extension}")
+
+
+class PriceIndex:
+    # Dense lookup table over the tier columns of a product file. Row IDs are positions in products_df,
+    # prices[row, 0] is the base 'Price' and prices[row, k] the price of the k-th smallest tier.
+    def __init__(self, products_df: pd.DataFrame) -> None:
+        tier_columns = sorted(
+            ((int(str(column)), column) for column in products_df.columns if str(column).isdigit()),
+            key=lambda tier: tier[0],
+        )
+        self.tiers: np.ndarray = np.array([tier for tier, _ in tier_columns], dtype=np.int64)
+
+        price_columns = ['Price'] + [column for _, column in tier_columns]
+        prices = products_df[price_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        # A blank tier cell means "no discount at this size", so it inherits the price of the tier below it
+        prices = pd.DataFrame(prices).ffill(axis=1).to_numpy(dtype=np.float64)
+        prices.setflags(write=False)
+        self.prices: np.ndarray = prices
+
+        self.products: List[str] = products_df['Product'].astype(str).tolist()
+        self.flavours: List[str] = products_df['Flavour'].astype(str).tolist()
+        self.descriptions: List[str] = [f"{product} - {flavour}" for product, flavour in zip(self.products, self.flavours)]
+        self.row_ids: Dict[Tuple[str, str], int] = {}
+        self.product_rows: Dict[str, List[int]] = {}
+        for row, key in enumerate(zip(self.products, self.flavours)):
+            self.row_ids.setdefault(key, row)
+            self.product_rows.setdefault(key[0], []).append(row)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def row_id(self, product: str, flavour: str) -> Optional[int]:
+        return self.row_ids.get((product, flavour))
+
+    def rows_for_products(self, product_names: Iterable[str]) -> List[int]:
+        rows = set()
+        for name in product_names:
+            rows.update(self.product_rows.get(name, ()))
+        return sorted(rows)
+
+    def tier_slot(self, quantity: int) -> int:
+        # Column of the highest tier <= quantity, 0 (the base price) when the quantity is below every tier
+        return int(np.searchsorted(self.tiers, quantity, side='right'))
+
+    def price_at(self, row: int, quantity: int) -> float:
+        return float(self.prices[row, self.tier_slot(quantity)])
+
+    def best_price(self, row: int) -> float:
+        return float(self.prices[row, -1])
+
+
+class ProductCatalog:
+    # Read-only view of a product file. One instance is shared by every InvoiceGenerator in the process,
+    # so nothing here may be mutated after construction.
+    __slots__ = ('_file_path', '_products_df', '_mtime', '_loaded_at', '_load_seconds', '_price_index')
+
+    def __init__(self, file_path: str, products_df: pd.DataFrame, load_seconds: float = 0.0) -> None:
+        object.__setattr__(self, '_file_path', file_path)
+        object.__setattr__(self, '_products_df', products_df)
+        object.__setattr__(self, '_mtime', os.path.getmtime(file_path) if os.path.exists(file_path) else None)
+        object.__setattr__(self, '_loaded_at', time.time())
+        object.__setattr__(self, '_load_seconds', load_seconds)
+        object.__setattr__(self, '_price_index', PriceIndex(products_df))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ProductCatalog is immutable, use reload_catalog() to pick up changes")
+
+    @classmethod
+    def from_file(cls, file_path: str) -> 'ProductCatalog':
+        start = time.perf_counter()
+        products_df = read_product_file(file_path).reset_index(drop=True)
+        return cls(file_path, products_df, time.perf_counter() - start)
+
+    @property
+    def file_path(self) -> str:
+        return self._file_path
+
+    @property
+    def products_df(self) -> pd.DataFrame:
+        return self._products_df
+
+    @property
+    def price_index(self) -> PriceIndex:
+        return self._price_index
+
+    @property
+    def mtime(self) -> Optional[float]:
+        return self._mtime
+
+    @property
+    def loaded_at(self) -> float:
+        return self._loaded_at
+
+    @property
+    def load_seconds(self) -> float:
+        return self._load_seconds
+
+    def is_stale(self) -> bool:
+        return os.path.exists(self._file_path) and os.path.getmtime(self._file_path) != self._mtime
+
+    def __len__(self) -> int:
+        return len(self._products_df)
+
+    def __repr__(self) -> str:
+        return f"ProductCatalog({self._file_path!r}, products={len(self)})"
+
+
+_catalogs: Dict[str, ProductCatalog] = {}
+_catalog_lock = threading.Lock()
+_stats = {"loads": 0, "hits": 0, "misses": 0, "reloads": 0, "total_load_seconds": 0.0, "last_load_seconds": 0.0}
+
+
+def _load(key: str, file_path: str) -> ProductCatalog:
+    catalog = ProductCatalog.from_file(file_path)
+    _catalogs[key] = catalog
+    _stats["loads"] += 1
+    _stats["total_load_seconds"] += catalog.load_seconds
+    _stats["last_load_seconds"] = catalog.load_seconds
+    return catalog
+
+
+def get_catalog(file_path: str = "products.xlsx") -> ProductCatalog:
+    key = os.path.abspath(file_path)
+    with _catalog_lock:
+        if catalog := _catalogs.get(key):
+            _stats["hits"] += 1
+            return catalog
+        _stats["misses"] += 1
+        return _load(key, file_path)
+
+
+def reload_catalog(file_path: str = "products.xlsx") -> ProductCatalog:
+    # Generators created before the reload keep their old catalog, new ones get the fresh one
+    with _catalog_lock:
+        _stats["reloads"] += 1
+        return _load(os.path.abspath(file_path), file_path)
+
+
+def current_catalog(file_path: str = "products.xlsx") -> ProductCatalog:
+    # get_catalog, but reloads once the file has changed on disk. Render worker processes use it, they never see
+    # a reload_catalog call made in the bot process; the check costs one stat per call.
+    key = os.path.abspath(file_path)
+    with _catalog_lock:
+        catalog = _catalogs.get(key)
+        if catalog is not None and not catalog.is_stale():
+            _stats["hits"] += 1
+            return catalog
+        _stats["misses" if catalog is None else "reloads"] += 1
+        return _load(key, file_path)
+
+
+def clear_catalogs() -> None:
+    with _catalog_lock:
+        _catalogs.clear()
+
+
+def catalog_stats() -> dict:
+    with _catalog_lock:
+        stats = dict(_stats)
+        stats["cached"] = {key: len(catalog) for key, catalog in _catalogs.items()}
+    return stats
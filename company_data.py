@@ -0,0 +1,55 @@
+import argparse
+import csv
+import json
+import time
+from typing import Iterable, Iterator
+
+import config
+from database import CompanyDBManager, make_database
+
+
+def read_rows(path: str) -> Iterator[dict]:
+    # CSV with a header row, JSON Lines, or a JSON array. CSV and JSON Lines are read one row at a time.
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(file)
+        elif path.endswith(".jsonl"):
+            yield from (json.loads(line) for line in file if line.strip())
+        else:
+            yield from json.load(file)
+
+
+def write_rows(path: str, rows: Iterable[dict]) -> int:
+    # Written as the rows come, to CSV or JSON Lines depending on the extension
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = None
+        for row in rows:
+            if path.endswith(".csv"):
+                if writer is None:
+                    writer = csv.DictWriter(file, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+            else:
+                file.write(json.dumps(row) + "\n")
+            written += 1
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import or export companies and payments")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("table", choices=["companies", "payments"])
+    parser.add_argument("path", help=".csv, .jsonl, or (import only) .json")
+    parser.add_argument("--database", default=config.DATABASE_URL, help="database URL or SQLite file")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    db = CompanyDBManager(make_database(args.database))
+    start = time.perf_counter()
+    if args.action == "import":
+        load = db.import_companies if args.table == "companies" else db.import_payments
+        count = load(read_rows(args.path), batch_size=args.batch_size)
+    else:
+        count = write_rows(args.path, db.export_companies() if args.table == "companies" else db.export_payments())
+    print(f"{args.action.capitalize()}ed {count} {args.table} in {time.perf_counter() - start:.1f}s")
@@ -1,12 +1,53 @@
 import json
+import os
 import re
-from typing import List, Optional
+import threading
+from datetime import datetime
+from itertools import islice
 from peewee import *
-from peewee import Model
+from peewee import Database, Model
+from playhouse.db_url import connect
+# After the star import, which brings in peewee's own Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+from migrations import MigrationRunner
+
+
+def sqlite_pragmas() -> dict:
+    # WAL lets the io threads read while one of them writes; with WAL, synchronous=normal is still crash safe
+    return {
+        'journal_mode': 'wal',
+        'synchronous': config.SQLITE_SYNCHRONOUS,
+        'cache_size': -1024 * config.SQLITE_CACHE_MB,  # negative means KiB rather than pages
+        'mmap_size': 1024 * 1024 * config.SQLITE_MMAP_MB,
+        'busy_timeout': config.SQLITE_BUSY_TIMEOUT_MS,
+        'temp_store': 'memory',
+    }
+
+
+def make_database(url: str = config.DATABASE_URL, pool: bool = config.DB_POOL) -> Database:
+    # sqlite:///database.db or postgresql://..., a bare path means SQLite. Pooled connections are handed between
+    # threads, so the sqlite3 same-thread check is off; peewee still gives each thread its own connection at a time.
+    scheme, separator, rest = url.partition('://')
+    if not separator:
+        scheme, rest = 'sqlite', '/' + url
+    scheme = scheme.split('+')[0]
+    options = {}
+    if scheme == 'sqlite':
+        options.update(pragmas=sqlite_pragmas(), check_same_thread=False)
+    if pool:
+        scheme += '+pool'
+        options.update(
+            max_connections=config.DB_MAX_CONNECTIONS,
+            stale_timeout=config.DB_STALE_TIMEOUT,
+            timeout=config.DB_POOL_TIMEOUT,
+        )
+    return connect(f'{scheme}://{rest}', **options)
 
 
 class CompanyDBManager:
-    def __init__(self, db: PostgresqlDatabase) -> None:
+    def __init__(self, db: PostgresqlDatabase, cache: bool = config.DB_CACHE, migrate: bool = config.DB_MIGRATE) -> None:
 
         class Company(Model):
             name = CharField(primary_key=True)
@@ -55,6 +96,11 @@ class CompanyDBManager:
             class Meta:
                 database = db
                 constraints = [SQL('UNIQUE(company_id, payment_name, bank_name)')]
+                # The unique constraint serves lookups by payment name, this one serves lookups by bank name.
+                # Existing databases get it from migration 1 (migrations.py).
+                indexes = (
+                    (('company', 'bank_name'), False),
+                )
 
 
             def to_dict(self) -> dict:
@@ -70,16 +116,118 @@ class CompanyDBManager:
                 return json.dumps(self.to_dict())
 
 
+        class Invoice(Model):
+            # company_name is a plain column rather than a foreign key, archived invoices outlive their company
+            name = CharField(unique=True)  # "<company>_<number>", what /get_invoice takes
+            company_name = CharField(null=True)
+            number = CharField()
+            amount = FloatField(null=True)
+            created_at = DateTimeField(index=True)
+            path = CharField()
+            size = IntegerField()
+
+            class Meta:
+                database = db
+                indexes = (
+                    (('company_name', 'created_at'), False),
+                    (('company_name', 'number'), False),
+                )
+
+
         self.company_model: 'Model' = Company
         self.payment_model: 'Model' = Payment
+        self.invoice_model: 'Model' = Invoice
         self.db: PostgresqlDatabase = db
+        # Read-through cache of company and payment rows, including misses. Only the write methods below change
+        # these tables, and each one drops exactly the entries it touches. cache=False always goes to the database.
+        self.cache_enabled = cache
+        self._companies: Dict[str, Optional['Model']] = {}
+        self._payments: Dict[Tuple[str, str], Optional['Model']] = {}
+        self._payment_lists: Dict[str, Optional[List['Model']]] = {}
+        self._order_contexts: Dict[Tuple[str, str], Tuple[Optional['Model'], Optional['Model']]] = {}
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
         db.connect(reuse_if_open=True)
-        db.create_tables([self.company_model, self.payment_model], safe=True)
-
+        # Only tables that don't exist yet are created, with their indexes. Changes to existing tables go through
+        # migrations.py, create_tables would otherwise build new indexes on startup whether or not migrate is on.
+        with db.atomic():
+            for model in (self.company_model, self.payment_model, self.invoice_model):
+                if not model.table_exists():
+                    model.create_table()
+        if migrate:
+            self.migrate()
+
+    def migrate(self, target: Optional[int] = None) -> List[int]:
+        # Applies the schema migrations this database hasn't had yet, see migrations.py
+        return MigrationRunner(self).migrate(target)
+
+    def _cached(self, cache: dict, key, load: Callable[[], object]):
+        if not self.cache_enabled:
+            return load()
+        with self._cache_lock:
+            if key in cache:
+                self.cache_hits += 1
+                return cache[key]
+            self.cache_misses += 1
+            generation = self._cache_generation
+        value = load()
+        with self._cache_lock:
+            # A row read while a write invalidated it may already be stale, so it isn't kept
+            if generation == self._cache_generation:
+                cache[key] = value
+        return value
+
+    def _invalidate(self, company_name: str, company: bool = True) -> None:
+        # Drops the company's payments, and the company row itself unless only its payments changed
+        with self._cache_lock:
+            self._cache_generation += 1
+            if company:
+                self._companies.pop(company_name, None)
+            self._payment_lists.pop(company_name, None)
+            for key in [key for key in self._payments if key[0] == company_name]:
+                del self._payments[key]
+            for key in [key for key in self._order_contexts if key[0] == company_name]:
+                del self._order_contexts[key]
+
+    def _set_cached_counter(self, company_name: str, invoice_number: str) -> None:
+        # Every order reserves a number, so the cached rows are updated in place rather than evicted. The generation
+        # still moves on, so a load that read the old counter before the UPDATE isn't stored afterwards.
+        with self._cache_lock:
+            self._cache_generation += 1
+            companies = [self._companies.get(company_name)]
+            companies += [company for key, (company, _) in self._order_contexts.items() if key[0] == company_name]
+            payments = [payment for key, payment in self._payments.items() if key[0] == company_name]
+            payments += self._payment_lists.get(company_name) or []
+            # Payments hold the company row they were joined with; __rel__ avoids lazily loading one that wasn't
+            companies += [payment.__rel__.get('company') for payment in payments if payment is not None]
+            for company in companies:
+                if company is not None:
+                    company.invoice_number = invoice_number
+
+    def clear_cache(self) -> None:
+        with self._cache_lock:
+            self._cache_generation += 1
+            self._companies.clear()
+            self._payments.clear()
+            self._payment_lists.clear()
+            self._order_contexts.clear()
+
+    def cache_stats(self) -> dict:
+        with self._cache_lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                'enabled': self.cache_enabled,
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'hit_rate': self.cache_hits / lookups if lookups else 0.0,
+                'companies': len(self._companies),
+                'payments': len(self._payments),
+            }
 
     def company_exists(self, company_name: str) -> bool:
-        with self.db.connection_context():
-            return bool(self.company_model.select().where(self.company_model.name == company_name).exists())
+        return self.get_company_by_name(company_name) is not None
 
     def is_valid(self, invoice_number: str) -> bool:
         for char in invoice_number:
@@ -96,13 +244,59 @@ class CompanyDBManager:
             incremented_parts.append(incremented_part)
         return ''.join(incremented_parts)  # reassemble the stringe incremented invoice number
     
+    def reserve_invoice_numbers(self, company_name: str, n: int = 1) -> List[str]:
+        # Hands out the next n invoice numbers and moves the company's counter past them. The counter only moves
+        # with a single conditional UPDATE against the value that was read, so two callers can never get the same
+        # block; the loser of a race reads again and retries. Numbers of invoices that then fail are not reused.
+        if n < 1:
+            raise ValueError("Must reserve at least one invoice number.")
+        with self.db.connection_context():
+            while True:
+                current = (
+                    self.company_model.select(self.company_model.invoice_number)
+                    .where(self.company_model.name == company_name)
+                    .scalar()
+                )
+                if current is None:
+                    raise DoesNotExist(f"No company found with the name '{company_name}'")
+                numbers = [current]
+                for _ in range(n):
+                    numbers.append(self.increment_invoice_number(numbers[-1]))
+                updated = (
+                    self.company_model.update(invoice_number=numbers[-1])
+                    .where((self.company_model.name == company_name) & (self.company_model.invoice_number == current))
+                    .execute()
+                )
+                if updated:
+                    self._set_cached_counter(company_name, numbers[-1])
+                    return numbers[:-1]
+
+    def release_invoice_numbers(self, company_name: str, numbers: List[str]) -> bool:
+        # Gives back numbers from reserve_invoice_numbers that were never used, e.g. because rendering was busy.
+        # Only works while they are still the latest block: if another caller reserved after them, the counter has
+        # moved on and they stay a gap. Returns whether the counter was moved back.
+        if not numbers:
+            return False
+        with self.db.connection_context():
+            updated = (
+                self.company_model.update(invoice_number=numbers[0])
+                .where(
+                    (self.company_model.name == company_name)
+                    & (self.company_model.invoice_number == self.increment_invoice_number(numbers[-1]))
+                )
+                .execute()
+            )
+        if updated:
+            self._set_cached_counter(company_name, numbers[0])
+        return bool(updated)
+
     def add_company(self, name: str, address1: str, address2: str, city: str, postcode: str, country: str, email: str, company_number: int, vat_reg: str, vat_number: str, logo: str, invoice_number: str) -> 'Model':
         with self.db.connection_context():
             
             if not self.is_valid(invoice_number):
                 raise ValueError("Invalid invoice number.")
             
-            return self.company_model.create(
+            company = self.company_model.create(
                 name=name,
                 address1=address1,
                 address2=address2,
@@ -116,10 +310,12 @@ class CompanyDBManager:
                 logo=logo,
                 invoice_number=invoice_number
             )
+            self._invalidate(name)
+            return company
 
     def add_payment(self, company: 'Model', payment_name: str, bank_name: str, account_number: int, sort_code: str, bank_address: str) -> 'Model':
         with self.db.connection_context():
-            return self.payment_model.create(
+            payment = self.payment_model.create(
                 company=company,
                 payment_name=payment_name,  # new field for the payment's name
                 bank_name=bank_name,
@@ -127,20 +323,35 @@ class CompanyDBManager:
                 sort_code=sort_code,
                 bank_address=bank_address,
             )
+            self._invalidate(company.name, company=False)
+            return payment
 
     def get_company_by_name(self, name: str) -> Optional['Model']:
-        with self.db.connection_context():
-            try:
-                return self.company_model.get(self.company_model.name == name)
-            except DoesNotExist:
-                return None
+        def load() -> Optional['Model']:
+            with self.db.connection_context():
+                return self.company_model.get_or_none(self.company_model.name == name)
+
+        return self._cached(self._companies, name, load)
 
     def get_payments_by_company_name(self, company_name: str) -> Optional[List['Model']]:
-        with self.db.connection_context():
-            if company := self.get_company_by_name(company_name):
-                return list(company.payments)
-            else:
+        # One LEFT JOIN: no rows means no company, a row without a payment means a company with no payments
+        def load() -> Optional[List['Model']]:
+            with self.db.connection_context():
+                rows = list(
+                    self.company_model.select(self.company_model, self.payment_model)
+                    .join(self.payment_model, JOIN.LEFT_OUTER, on=(self.payment_model.company == self.company_model.name), attr='listed_payment')
+                    .where(self.company_model.name == company_name)
+                    .order_by(self.payment_model.id)
+                )
+            if not rows:
                 return None
+            payments = [row.listed_payment for row in rows if row.listed_payment is not None]
+            for payment in payments:
+                payment.company = rows[0]
+            return payments
+
+        payments = self._cached(self._payment_lists, company_name, load)
+        return None if payments is None else list(payments)
 
     def get_all_companies(self) -> List['Model']:
         with self.db.connection_context():
@@ -154,45 +365,261 @@ class CompanyDBManager:
         with self.db.connection_context():
             return list(self.payment_model.select())
 
+    def _clean_row(self, model: 'Model', row: dict, line: int) -> dict:
+        # CSV gives strings for everything: blank optional fields become NULL, numbers must parse
+        fields = model._meta.fields
+        cleaned = {}
+        for name, field in fields.items():
+            if name == 'id':
+                continue
+            value = row.get(name)
+            if isinstance(value, str):
+                value = value.strip()
+            if value in (None, ''):
+                if not field.null:
+                    raise ValueError(f"Row {line}: missing {name}")
+                value = None
+            elif isinstance(field, IntegerField):
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Row {line}: {name} must be a whole number, got {value!r}") from None
+            cleaned[name] = value
+        return cleaned
+
+    def _bulk_upsert(self, model: 'Model', rows: Iterable[dict], conflict_target: list, preserve: list, batch_size: int) -> int:
+        # Chunks of rows with one transaction each, reading the input as it goes. A bad row stops the import there;
+        # the chunks before it stay committed, and re-running the fixed file just upserts them again.
+        # The upsert is rendered once by insert_many and then sent with executemany: letting peewee render every
+        # value of every chunk costs several times more than SQLite takes to write the rows.
+        fields = [field for name, field in model._meta.fields.items() if name != 'id']
+        rows = iter(rows)
+        line = 0
+        imported = 0
+        try:
+            with self.db.connection_context():
+                sql = None
+                while True:
+                    chunk = []
+                    companies: Dict[str, int] = {}  # company name -> first row naming it, for payments
+                    for row in islice(rows, batch_size):
+                        line += 1
+                        cleaned = self._clean_row(model, row, line)
+                        if model is self.company_model and not self.is_valid(cleaned['invoice_number']):
+                            raise ValueError(f"Row {line}: invalid invoice number {cleaned['invoice_number']!r}")
+                        if model is self.payment_model:
+                            companies.setdefault(cleaned['company'], line)
+                        chunk.append(tuple(cleaned[field.name] for field in fields))
+                    if not chunk:
+                        break
+                    if companies:
+                        # The raw executemany bypasses peewee and SQLite doesn't enforce the foreign key, so check it here
+                        known = {name for (name,) in self.company_model.select(self.company_model.name).where(self.company_model.name.in_(list(companies))).tuples()}
+                        for name, first_line in sorted(companies.items(), key=lambda item: item[1]):
+                            if name not in known:
+                                raise ValueError(f"Row {first_line}: unknown company {name!r}")
+                    if sql is None:
+                        query = model.insert_many(chunk[:1], fields=fields).on_conflict(conflict_target=conflict_target, preserve=preserve)
+                        sql, _ = query.sql()
+                    with self.db.atomic():
+                        self.db.cursor().executemany(sql, chunk)
+                    imported += len(chunk)
+        finally:
+            # Chunks committed before a bad row have changed rows too
+            self.clear_cache()
+        return imported
+
+    def import_companies(self, rows: Iterable[dict], batch_size: int = 500) -> int:
+        # Rows use the Company field names (as export_companies writes them). Existing companies are updated in
+        # place, except for invoice_number: the live counter is never moved back by an import.
+        fields = self.company_model._meta.fields
+        preserve = [field for name, field in fields.items() if name not in ('name', 'invoice_number')]
+        return self._bulk_upsert(self.company_model, rows, [self.company_model.name], preserve, batch_size)
+
+    def import_payments(self, rows: Iterable[dict], batch_size: int = 500) -> int:
+        # Rows use the Payment field names, with the company's name in "company". A payment with the same company,
+        # payment_name and bank_name is updated in place. A row naming a company that doesn't exist stops the import.
+        payment = self.payment_model
+        conflict_target = [payment.company, payment.payment_name, payment.bank_name]
+        preserve = [payment.account_number, payment.sort_code, payment.bank_address]
+        return self._bulk_upsert(payment, rows, conflict_target, preserve, batch_size)
+
+    def export_companies(self) -> Iterator[dict]:
+        # Streams rows as plain dicts, the whole table is never held in memory
+        with self.db.connection_context():
+            yield from self.company_model.select().order_by(self.company_model.name).dicts().iterator()
+
+    def export_payments(self) -> Iterator[dict]:
+        fields = [field for name, field in self.payment_model._meta.fields.items() if name != 'id']
+        with self.db.connection_context():
+            query = self.payment_model.select(*fields).order_by(self.payment_model.company, self.payment_model.id)
+            yield from query.dicts().iterator()
+
     def update_company(self, company_name: str, **kwargs) -> Optional['Model']:
         with self.db.connection_context():
             try:
                 query = self.company_model.update(kwargs).where(self.company_model.name == company_name)
                 query.execute()
-                return self.get_company_by_name(company_name)
+                self._invalidate(company_name)
+                if 'name' in kwargs:
+                    self._invalidate(kwargs['name'])
+                return self.get_company_by_name(kwargs.get('name', company_name))
             except DoesNotExist:
                 return None
 
     def delete_company(self, company_name: str) -> int:
         with self.db.connection_context():
-            return self.company_model.delete().where(self.company_model.name == company_name).execute()
+            deleted = self.company_model.delete().where(self.company_model.name == company_name).execute()
+            self._invalidate(company_name)
+            return deleted
 
     def update_payment(self, company_name: str, payment_name: str, **kwargs) -> Optional['Model']:
         with self.db.connection_context():
             try:
-                company = self.get_company_by_name(company_name)
-                query = self.payment_model.update(kwargs).where((self.payment_model.company == company) & (self.payment_model.payment_name == payment_name))
+                # The foreign key column holds the company name, so no company lookup is needed first
+                query = self.payment_model.update(kwargs).where((self.payment_model.company == company_name) & (self.payment_model.payment_name == payment_name))
                 query.execute()
+                self._invalidate(company_name, company=False)
                 return self.get_payments_by_company_name(company_name)
             except DoesNotExist:
                 return None
 
     def delete_payment(self, company_name: str, payment_name: str) -> int:
         with self.db.connection_context():
-            company = self.get_company_by_name(company_name)
-            return self.payment_model.delete().where((self.payment_model.company == company) & (self.payment_model.payment_name == payment_name)).execute()
+            deleted = self.payment_model.delete().where((self.payment_model.company == company_name) & (self.payment_model.payment_name == payment_name)).execute()
+            self._invalidate(company_name, company=False)
+            return deleted
+
+    def _payment_match(self, company_name: str, payment_name_or_bank: Optional[str]):
+        # Id of the company's payment with that payment name or, failing that, that bank name, as a subquery.
+        # Written as a UNION ALL of two exact lookups rather than "payment_name = x OR bank_name = x", so each half
+        # seeks its own index (the unique constraint, and (company_id, bank_name)) whether or not the database has
+        # statistics; with the OR, SQLite would rather scan all of the company's payments.
+        # The rank column keeps a payment name match ahead of another payment's bank name.
+        match = self.payment_model.alias()
+        by_name = match.select(match.id, Value(0).alias('rank')).where((match.company == company_name) & (match.payment_name == payment_name_or_bank))
+        by_bank = match.select(match.id, Value(1).alias('rank')).where((match.company == company_name) & (match.bank_name == payment_name_or_bank))
+        ranked = (by_name + by_bank).order_by(SQL('rank')).limit(1)
+        return ranked.select_from(ranked.c.id)
 
     def get_payment_by_name_or_bank(self, company_name: str, payment_name_or_bank: str) -> Optional['Model']:
+        def load() -> Optional['Model']:
+            # Selecting the company in the same query means to_dict on the (cached) row never goes back for it
+            with self.db.connection_context():
+                return (
+                    self.payment_model.select(self.payment_model, self.company_model)
+                    .join(self.company_model)
+                    .where(self.payment_model.id == self._payment_match(company_name, payment_name_or_bank))
+                    .get_or_none()
+                )
+
+        return self._cached(self._payments, (company_name, payment_name_or_bank), load)
+
+    def get_order_context(self, company_name: str, payment_key: Optional[str]) -> Tuple[Optional['Model'], Optional['Model']]:
+        # The company and the payment an order asks for, matched by payment name or bank name, in one query.
+        # Returns (None, None) for an unknown company and (company, None) when it has no such payment.
+        def load() -> Tuple[Optional['Model'], Optional['Model']]:
+            with self.db.connection_context():
+                company = (
+                    self.company_model.select(self.company_model, self.payment_model)
+                    .join(
+                        self.payment_model,
+                        JOIN.LEFT_OUTER,
+                        on=(self.payment_model.id == self._payment_match(company_name, payment_key)),
+                        attr='order_payment',
+                    )
+                    .where(self.company_model.name == company_name)
+                    .get_or_none()
+                )
+            if company is None:
+                return None, None
+            payment = company.order_payment
+            if payment is not None:
+                payment.company = company
+            return company, payment
+
+        return self._cached(self._order_contexts, (company_name, payment_key), load)
+
+    @staticmethod
+    def invoice_name(company_name: Optional[str], invoice_number: str) -> str:
+        return f"{company_name}_{invoice_number}" if company_name else invoice_number
+
+    def add_invoice(self, company_name: str, invoice_number: str, amount: Optional[float], path: str, size: int, created_at: Optional[datetime] = None) -> None:
+        # Archiving the same invoice again replaces its row, so a rewritten PDF never shows up twice
+        row = {
+            'name': self.invoice_name(company_name, invoice_number),
+            'company_name': company_name,
+            'number': invoice_number,
+            'amount': amount,
+            'created_at': created_at or datetime.now(),
+            'path': path,
+            'size': size,
+        }
         with self.db.connection_context():
-            company = self.get_company_by_name(company_name)
-            try:
-                return self.payment_model.get((self.payment_model.company == company) & ((self.payment_model.payment_name == payment_name_or_bank) | (self.payment_model.bank_name == payment_name_or_bank)))
-            except DoesNotExist:
-                return None
-            
-            
+            self.invoice_model.insert(row).on_conflict(
+                conflict_target=[self.invoice_model.name],
+                preserve=[self.invoice_model.amount, self.invoice_model.created_at, self.invoice_model.path, self.invoice_model.size],
+            ).execute()
+
+    def add_invoices(self, rows: Iterable[dict], batch_size: int = 500) -> int:
+        # Bulk version of add_invoice for batches and imports. Rows take the Invoice fields; names already indexed are kept.
+        rows = [{'name': self.invoice_name(row.get('company_name'), row['number']), **row} for row in rows]
+        with self.db.connection_context(), self.db.atomic():
+            for start in range(0, len(rows), batch_size):
+                self.invoice_model.insert_many(rows[start:start + batch_size]).on_conflict_ignore().execute()
+        return len(rows)
+
+    def get_invoice(self, name: str) -> Optional['Model']:
+        with self.db.connection_context():
+            return self.invoice_model.get_or_none(self.invoice_model.name == name)
+
+    def update_invoice(self, name: str, **kwargs) -> int:
+        with self.db.connection_context():
+            return self.invoice_model.update(kwargs).where(self.invoice_model.name == name).execute()
+
+    def _invoice_query(self, company_name: Optional[str], since: Optional[datetime], until: Optional[datetime]):
+        query = self.invoice_model.select()
+        if company_name is not None:
+            query = query.where(self.invoice_model.company_name == company_name)
+        if since is not None:
+            query = query.where(self.invoice_model.created_at >= since)
+        if until is not None:
+            query = query.where(self.invoice_model.created_at < until)
+        return query
+
+    def list_invoices(self, company_name: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None, page: int = 1, page_size: int = 50) -> List['Model']:
+        # Newest first; the (company_name, created_at) and created_at indexes serve both the filter and the order
+        with self.db.connection_context():
+            query = self._invoice_query(company_name, since, until)
+            return list(query.order_by(self.invoice_model.created_at.desc(), self.invoice_model.id.desc()).paginate(page, page_size))
+
+    def count_invoices(self, company_name: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None) -> int:
+        with self.db.connection_context():
+            return self._invoice_query(company_name, since, until).count()
+
+    def import_invoice_files(self, directory: str = "invoices") -> int:
+        # One-off indexing of PDFs archived before the registry existed. Names are "<company>_<number>.pdf", or just
+        # "<number>.pdf" for a few old ones; the amount isn't recoverable from the file, so it is left empty.
+        rows = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith('.pdf'):
+                    continue
+                company_name, _, number = os.path.splitext(entry.name)[0].rpartition('_')
+                stat = entry.stat()
+                rows.append({
+                    'company_name': company_name or None,
+                    'number': number,
+                    'amount': None,
+                    'created_at': datetime.fromtimestamp(stat.st_mtime),
+                    'path': entry.path,
+                    'size': stat.st_size,
+                })
+        return self.add_invoices(rows)
+
+
 if __name__ == "__main__":
-    db = SqliteDatabase("database.db")
+    db = make_database()
     db_manager = CompanyDBManager(db)
     
     print(db_manager.get_payment_by_name_or_bank("XYZ Ltd", "Tide"))
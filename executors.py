@@ -0,0 +1,126 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import config
+
+
+class StageBusy(Exception):
+    pass
+
+
+class Stage:
+    # A named pool for one kind of blocking work. At most `workers` jobs run at once and at most `queue_limit`
+    # more may wait; anything beyond that is refused with StageBusy so handlers can tell the user to retry.
+    def __init__(self, name: str, kind: str = "thread", workers: int = 4, queue_limit: int = 16, initializer: Optional[Callable] = None) -> None:
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported executor kind for stage {name}: {kind}")
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.initializer = initializer
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        # Created on first use, so importing the bot does not start worker processes
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    # Spawned, not forked: a fork would copy the bot's event loop, its threads and any lock they hold
+                    context = multiprocessing.get_context("spawn")
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=self.initializer)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"stage-{self.name}", initializer=self.initializer)
+            return self._executor
+
+    def _check_capacity(self) -> None:
+        if self.pending >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise StageBusy(f"The {self.name} stage is busy ({self.pending} jobs queued)")
+
+    def _admit(self) -> None:
+        with self._lock:
+            self._check_capacity()
+            self.pending += 1
+
+    def ensure_capacity(self) -> None:
+        # Raises StageBusy now if a job would be refused, for callers that should not start work they can't finish.
+        # Only a hint: the stage may still fill up before the job is submitted.
+        with self._lock:
+            self._check_capacity()
+
+    def _done(self) -> None:
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        self._admit()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._done()
+
+    async def run_async(self, fn: Callable, *args, **kwargs):
+        # For work that is already non-blocking (async HTTP): same admission and concurrency limit, no executor
+        self._admit()
+        try:
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.workers)
+            async with self._slots:
+                return await fn(*args, **kwargs)
+        finally:
+            self._done()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"kind": self.kind, "workers": self.workers, "pending": self.pending, "completed": self.completed, "rejected": self.rejected}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+_stages: Dict[str, Stage] = {}
+_initializers: Dict[str, Callable] = {}
+_stages_lock = threading.Lock()
+
+
+def get_stage(name: str) -> Stage:
+    with _stages_lock:
+        if (stage := _stages.get(name)) is None:
+            kind, workers, queue_limit = config.stage_config(name)
+            stage = _stages[name] = Stage(name, kind, workers, queue_limit, initializer=_initializers.get(name))
+        return stage
+
+
+def set_stage_initializer(name: str, initializer: Callable) -> None:
+    # Runs in every worker the stage starts, e.g. to load what its jobs need before the first one arrives. Takes
+    # effect for workers started after the call, so set it up before the stage's first job.
+    with _stages_lock:
+        _initializers[name] = initializer
+        if (stage := _stages.get(name)) is not None:
+            stage.initializer = initializer
+
+
+def stage_stats() -> Dict[str, dict]:
+    with _stages_lock:
+        return {name: stage.stats() for name, stage in _stages.items()}
+
+
+def shutdown_stages() -> None:
+    with _stages_lock:
+        for stage in _stages.values():
+            stage.shutdown()
@@ -0,0 +1,135 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from peewee import *
+from peewee import Model
+
+
+_AMOUNT = re.compile(r"([£$€])\s*(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)")
+
+
+def _canonical_amount(match: re.Match) -> str:
+    number = float(match.group(2).replace(",", ""))
+    return match.group(1) + (str(int(number)) if number.is_integer() else repr(number))
+
+
+def normalize_prompt(prompt: str) -> str:
+    # "£1,000.00" and "£1000" map to the same key, and so do runs of whitespace. Only amounts after a currency
+    # sign are rewritten and case is kept: account numbers, sort codes, postcodes and names with leading zeros
+    # or different case are different orders.
+    text = _AMOUNT.sub(_canonical_amount, prompt.strip())
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class ExtractionCache:
+    # Two tiers of prompt -> parsed orders: an in-memory LRU in front of a SQLite table with a TTL and a row limit.
+    def __init__(
+        self,
+        db: SqliteDatabase,
+        load: Callable[[dict], object],
+        memory_size: int = 512,
+        ttl: float = 7 * 24 * 3600,
+        max_rows: int = 10000,
+    ) -> None:
+
+        class CachedExtraction(Model):
+            key = TextField(primary_key=True)
+            orders = TextField()
+            created_at = FloatField()
+            last_used_at = FloatField(index=True)
+
+            class Meta:
+                database = db
+                table_name = 'extraction_cache'
+
+        self.model: 'Model' = CachedExtraction
+        self.db: SqliteDatabase = db
+        self.load = load
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._writes = 0
+        with self.db.connection_context():
+            db.create_tables([self.model], safe=True)
+
+    def get(self, prompt: str) -> Optional[List]:
+        key = normalize_prompt(prompt)
+        now = time.time()
+        with self._lock:
+            if (entry := self._memory.get(key)) is not None:
+                created_at, orders = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return orders
+                del self._memory[key]
+
+        with self.db.connection_context():
+            row = self.model.get_or_none(self.model.key == key)
+            if row is None or now - row.created_at > self.ttl:
+                with self._lock:
+                    self.misses += 1
+                return None
+            self.model.update(last_used_at=now).where(self.model.key == key).execute()
+
+        orders = [self.load(order) for order in json.loads(row.orders)]
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, row.created_at, orders)
+        return orders
+
+    def put(self, prompt: str, orders: List) -> None:
+        key = normalize_prompt(prompt)
+        now = time.time()
+        payload = json.dumps([order.dict() for order in orders])
+        with self._lock:
+            self._remember(key, now, orders)
+            self._writes += 1
+            prune = self._writes % 100 == 0
+        with self.db.connection_context():
+            self.model.insert(key=key, orders=payload, created_at=now, last_used_at=now).on_conflict_replace().execute()
+            if prune:
+                self.prune()
+
+    def _remember(self, key: str, created_at: float, orders: List) -> None:
+        self._memory[key] = (created_at, orders)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def prune(self) -> int:
+        # Drop expired rows, then the least recently used ones above max_rows
+        with self.db.connection_context():
+            deleted = self.model.delete().where(self.model.created_at < time.time() - self.ttl).execute()
+            excess = self.model.select().count() - self.max_rows
+            if excess > 0:
+                oldest = self.model.select(self.model.key).order_by(self.model.last_used_at).limit(excess)
+                deleted += self.model.delete().where(self.model.key.in_(oldest)).execute()
+        return deleted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        with self.db.connection_context():
+            self.model.delete().execute()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
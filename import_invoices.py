@@ -0,0 +1,18 @@
+import argparse
+import time
+
+import config
+from database import CompanyDBManager, make_database
+
+
+if __name__ == "__main__":
+    # One-off: index the PDFs archived before the invoice registry existed, so /list_invoices and /get_invoice see them
+    parser = argparse.ArgumentParser(description="Index existing invoice PDFs into the invoice registry")
+    parser.add_argument("--directory", default="invoices")
+    parser.add_argument("--database", default=config.DATABASE_URL, help="database URL or SQLite file")
+    args = parser.parse_args()
+
+    db = CompanyDBManager(make_database(args.database))
+    start = time.perf_counter()
+    found = db.import_invoice_files(args.directory)
+    print(f"Indexed {found} invoice files from {args.directory} in {time.perf_counter() - start:.1f}s, {db.count_invoices()} in the registry")
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import re
+import sys
+import threading
+import unicodedata
+from datetime import datetime
+from typing import Optional, Set
+
+import config
+from utils import write_bytes
+
+
+def company_segment(company_name: Optional[str]) -> str:
+    # "Google Ltd" -> google-ltd-6b1f4a2e. The slug keeps the tree readable, the hash keeps "Google Ltd" and
+    # "google-ltd" apart. Invoices archived without a company go under _unassigned.
+    if not company_name:
+        return "_unassigned"
+    text = unicodedata.normalize("NFKD", company_name).encode("ascii", "ignore").decode("ascii")
+    slug = re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:48] or "company"
+    return f"{slug}-{hashlib.sha1(company_name.encode('utf-8')).hexdigest()[:8]}"
+
+
+def number_segment(invoice_number: str) -> str:
+    # Invoice numbers are already unique per company, only characters that aren't safe in a file name are replaced
+    return re.sub(r"[^A-Za-z0-9._-]", "_", invoice_number).lstrip(".") or "_"
+
+
+def invoice_key(company_name: Optional[str], invoice_number: str, created_at: datetime) -> str:
+    # <company>/<year>/<month>/<number>.pdf, so no directory grows past one company's invoices for one month
+    return "/".join((company_segment(company_name), f"{created_at:%Y}", f"{created_at:%m}", number_segment(invoice_number) + ".pdf"))
+
+
+class InvoiceStore:
+    # Archived PDFs under root, sharded by invoice_key. Keys are computed, never found by listing a directory;
+    # shard directories that are known to exist are remembered so a write costs no extra mkdir.
+    def __init__(self, root: str = config.INVOICE_DIR) -> None:
+        self.root = root
+        self._dirs: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def _ensure_dir(self, directory: str) -> None:
+        with self._lock:
+            if directory in self._dirs:
+                return
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._dirs.add(directory)
+
+    def put(self, key: str, data: bytes) -> str:
+        # Atomic: readers see either no file or the complete PDF
+        path = self.path(key)
+        self._ensure_dir(os.path.dirname(path))
+        write_bytes(path, data)
+        return path
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def read(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as file:
+            return file.read()
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def migrate_flat(self, db, source_dir: Optional[str] = None) -> int:
+        # Move the old flat "<company>_<number>.pdf" files into their shards and point the registry at the new paths.
+        # Invoices the registry already knows keep their created_at, the rest are dated by the file's mtime.
+        # Safe to run again: only files left at the top level of source_dir are touched.
+        source_dir = source_dir or self.root
+        moved = 0
+        with os.scandir(source_dir) as entries:
+            files = [entry for entry in entries if entry.is_file() and entry.name.endswith(".pdf")]
+        for entry in files:
+            company_name, _, invoice_number = os.path.splitext(entry.name)[0].rpartition("_")
+            company_name = company_name or None
+            name = db.invoice_name(company_name, invoice_number)
+            record = db.get_invoice(name)
+            stat = entry.stat()
+            created_at = record.created_at if record else datetime.fromtimestamp(stat.st_mtime)
+            path = self.path(invoice_key(company_name, invoice_number, created_at))
+            self._ensure_dir(os.path.dirname(path))
+            os.replace(entry.path, path)
+            if record:
+                db.update_invoice(name, path=path)
+            else:
+                db.add_invoice(company_name, invoice_number, None, path, stat.st_size, created_at=created_at)
+            moved += 1
+        return moved
+
+
+_store: Optional[InvoiceStore] = None
+_store_lock = threading.Lock()
+
+
+def get_invoice_store() -> InvoiceStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = InvoiceStore()
+        return _store
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["migrate"]:
+        from database import CompanyDBManager, make_database
+
+        database_url = sys.argv[2] if len(sys.argv) > 2 else config.DATABASE_URL
+        moved = get_invoice_store().migrate_flat(CompanyDBManager(make_database(database_url)))
+        print(f"Moved {moved} invoices into {config.INVOICE_DIR}")
+    else:
+        print("Usage: python invoice_store.py migrate [database URL or SQLite file]")
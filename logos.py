@@ -0,0 +1,164 @@
+import logging
+import os
+import sys
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+import config
+
+Box = Tuple[int, int]
+
+
+def logo_box() -> Box:
+    return config.LOGO_WIDTH, config.LOGO_HEIGHT
+
+
+def variant_stem(source: str, box: Box) -> str:
+    # logos/file_7.jpg -> file_7_jpg-200x160, the extension is part of the name so file_7.png can't collide
+    return f"{os.path.basename(source).replace('.', '_')}-{box[0]}x{box[1]}"
+
+
+def normalize_logo(source: str, destination_stem: str, box: Box, quality: int = config.LOGO_QUALITY) -> str:
+    # Fit the image inside the box, drop EXIF/ICC/comments and recompress. Images with transparency stay PNG,
+    # everything else becomes a baseline JPEG. Written to a temp file first so a concurrent render never reads half a file.
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail(box, Image.LANCZOS)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        image.info.clear()
+
+    extension = ".png" if has_alpha else ".jpg"
+    destination = destination_stem + extension
+    directory = os.path.dirname(destination) or "."
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=extension)
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            if has_alpha:
+                image.save(file, "PNG", optimize=True)
+            else:
+                image.save(file, "JPEG", quality=quality, optimize=True)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, destination)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return destination
+
+
+class LogoVariants:
+    # Derived copies of the uploaded logos, one per source file and box size. A variant is rebuilt when its source
+    # is newer, and the lookup is memoized so a render costs one stat of the source file.
+    def __init__(self, variant_dir: str = config.LOGO_VARIANT_DIR, quality: int = config.LOGO_QUALITY) -> None:
+        self.variant_dir = variant_dir
+        self.quality = quality
+        self._memo: Dict[Tuple[str, Box], Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+        self.built = 0
+        self.failed = 0
+
+    def _existing(self, stem: str, source_mtime: int) -> Optional[str]:
+        for extension in (".jpg", ".png"):
+            path = stem + extension
+            try:
+                if os.stat(path).st_mtime_ns >= source_mtime:
+                    return path
+            except FileNotFoundError:
+                continue
+        return None
+
+    def get(self, source: Optional[str], box: Optional[Box] = None) -> Optional[str]:
+        # Path to the normalized logo, or the source itself if it can't be decoded.
+        # A company without a logo, or whose logo file is gone, gets its source back unchanged.
+        if not source or not os.path.isfile(source):
+            return source
+        box = box or logo_box()
+        key = (os.path.abspath(source), box)
+        source_mtime = os.stat(source).st_mtime_ns
+        with self._lock:
+            if (entry := self._memo.get(key)) is not None and entry[0] == source_mtime:
+                return entry[1]
+
+        stem = os.path.join(self.variant_dir, variant_stem(source, box))
+        path = self._existing(stem, source_mtime)
+        if path is None:
+            try:
+                path = normalize_logo(source, stem, box, self.quality)
+            except OSError:
+                logging.exception("Could not normalize logo %s, using the original", source)
+                with self._lock:
+                    self.failed += 1
+                return source
+            with self._lock:
+                self.built += 1
+
+        with self._lock:
+            self._memo[key] = (source_mtime, path)
+        return path
+
+    def remove(self, source: Optional[str]) -> int:
+        # Delete every variant of a logo, e.g. when its company is deleted
+        if not source:
+            return 0
+        prefix = os.path.basename(source).replace(".", "_") + "-"
+        with self._lock:
+            for key in [key for key in self._memo if key[0] == os.path.abspath(source)]:
+                del self._memo[key]
+        removed = 0
+        if os.path.isdir(self.variant_dir):
+            for name in os.listdir(self.variant_dir):
+                if name.startswith(prefix):
+                    os.remove(os.path.join(self.variant_dir, name))
+                    removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"variants": len(self._memo), "built": self.built, "failed": self.failed}
+
+
+_variants: Optional[LogoVariants] = None
+_variants_lock = threading.Lock()
+
+
+def get_logo_variants() -> LogoVariants:
+    global _variants
+    with _variants_lock:
+        if _variants is None:
+            _variants = LogoVariants()
+        return _variants
+
+
+def logo_variant(source: Optional[str], box: Optional[Box] = None) -> Optional[str]:
+    return get_logo_variants().get(source, box)
+
+
+def logo_uri(source: Optional[str], box: Optional[Box] = None) -> Optional[str]:
+    # file:// URI of the logo to render, or None to render the invoice without one
+    if not source or not os.path.isfile(source):
+        return None
+    return f"file://{os.path.abspath(logo_variant(source, box))}"
+
+
+def backfill(db) -> Dict[str, str]:
+    # Build the variant of every company's stored logo, for logos uploaded before variants existed
+    variants = {}
+    for company in db.get_all_companies():
+        if company.logo and os.path.exists(company.logo):
+            variants[company.name] = logo_variant(company.logo)
+    return variants
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["backfill"]:
+        from database import CompanyDBManager, make_database
+
+        database_url = sys.argv[2] if len(sys.argv) > 2 else config.DATABASE_URL
+        for name, path in backfill(CompanyDBManager(make_database(database_url))).items():
+            print(f"{name}: {path}")
+    else:
+        print("Usage: python logos.py backfill [database URL or SQLite file]")
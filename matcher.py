@@ -0,0 +1,162 @@
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from fuzzywuzzy import fuzz, process
+
+from catalog import PriceIndex
+
+
+def normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", str(text).lower()).split())
+
+
+def trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+class ProductMatch:
+    __slots__ = ('query', 'product', 'flavour', 'score', 'rows')
+
+    def __init__(self, query: str, product: str, flavour: Optional[str], score: int, rows: List[int]) -> None:
+        self.query = query
+        self.product = product
+        self.flavour = flavour  # Set when the query matched a "Product - Flavour" pair rather than a whole product
+        self.score = score
+        self.rows = rows
+
+    def __repr__(self) -> str:
+        return f"ProductMatch({self.query!r} -> {self.product!r}, {self.flavour!r}, score={self.score})"
+
+
+class ProductMatcher:
+    # Fuzzy matching of free-text product names against a catalog without scanning it. Every product name and
+    # "Product - Flavour" pair is indexed by its character trigrams; a query only rescores (with the same
+    # fuzz.WRatio scorer process.extractOne uses) the few entries sharing the most trigrams with it.
+    def __init__(self, price_index: PriceIndex, candidates: int = 25, max_posting: int = 5000, memo_size: int = 4096) -> None:
+        self.candidates = candidates
+        self.max_posting = max_posting
+        self.memo_size = memo_size
+
+        product_names = list(dict.fromkeys(price_index.products))
+        self.labels: List[str] = product_names + price_index.descriptions
+        self.products: List[str] = product_names + price_index.products
+        self.flavours: List[Optional[str]] = [None] * len(product_names) + price_index.flavours
+        self.entry_rows: List[List[int]] = [price_index.product_rows[name] for name in product_names] + [[row] for row in range(len(price_index))]
+        self.normalized: List[str] = [normalize(label) for label in self.labels]
+
+        postings: Dict[str, List[int]] = {}
+        sizes = np.zeros(len(self.labels), dtype=np.float64)
+        for entry, text in enumerate(self.normalized):
+            grams = trigrams(text)
+            sizes[entry] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(entry)
+        self.postings: Dict[str, np.ndarray] = {gram: np.array(entries, dtype=np.int64) for gram, entries in postings.items()}
+        self.sizes = np.maximum(sizes, 1)
+
+        self._memo: 'OrderedDict[str, ProductMatch]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def match(self, query: str) -> Optional[ProductMatch]:
+        return self.match_many([query])[0]
+
+    def match_many(self, queries: Sequence[str]) -> List[Optional[ProductMatch]]:
+        keys = [normalize(query) for query in queries]
+        found: Dict[str, ProductMatch] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memo:
+                    self._memo.move_to_end(key)
+                    found[key] = self._memo[key]
+                    self.hits += 1
+        missing = list(dict.fromkeys(key for key in keys if key and key not in found))
+        if missing:
+            computed = self._score(missing)
+            with self._lock:
+                for key, match in zip(missing, computed):
+                    self.misses += 1
+                    if match is not None:
+                        found[key] = self._memo[key] = match
+                while len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+        return [found.get(key) for key in keys]
+
+    def _score(self, keys: List[str]) -> List[Optional[ProductMatch]]:
+        # Dice overlap of every query with the entries it shares a trigram with, counted for the whole batch at once,
+        # then exact rescoring of each query's top candidates
+        n = len(self.labels)
+        query_ids, entry_ids = [], []
+        query_sizes = np.zeros(len(keys), dtype=np.float64)
+        for q, key in enumerate(keys):
+            grams = trigrams(key)
+            query_sizes[q] = len(grams)
+            lists = [self.postings[gram] for gram in grams if gram in self.postings]
+            # Trigrams shared by a large part of the catalog say little about the match and dominate the cost
+            selective = [entries for entries in lists if len(entries) <= self.max_posting] or lists
+            if selective:
+                entries = np.concatenate(selective)
+                entry_ids.append(entries)
+                query_ids.append(np.full(len(entries), q, dtype=np.int64))
+        if not entry_ids:
+            return [self._fallback(key) for key in keys]
+
+        pairs, overlap = np.unique(np.concatenate(query_ids) * n + np.concatenate(entry_ids), return_counts=True)
+        pair_queries, pair_entries = pairs // n, pairs % n
+        dice = 2 * overlap / (query_sizes[pair_queries] + self.sizes[pair_entries])
+        bounds = np.searchsorted(pair_queries, np.arange(len(keys) + 1))
+
+        matches = []
+        for q, key in enumerate(keys):
+            entries, scores = pair_entries[bounds[q]:bounds[q + 1]], dice[bounds[q]:bounds[q + 1]]
+            if not len(entries):
+                matches.append(self._fallback(key))
+                continue
+            if len(entries) > self.candidates:
+                entries = entries[np.argpartition(-scores, self.candidates - 1)[:self.candidates]]
+            # Lowest entry id wins ties, so a whole product is preferred over one of its flavours
+            ranked = [(fuzz.WRatio(key, self.normalized[entry]), -entry) for entry in entries.tolist()]
+            score, entry = max(ranked)
+            matches.append(self._entry_match(key, -entry, score))
+        return matches
+
+    def _fallback(self, key: str) -> Optional[ProductMatch]:
+        if not key:
+            return None
+        result = process.extractOne(key, self.normalized)
+        return self._entry_match(key, self.normalized.index(result[0]), result[1]) if result else None
+
+    def _entry_match(self, key: str, entry: int, score: int) -> ProductMatch:
+        return ProductMatch(key, self.products[entry], self.flavours[entry], score, self.entry_rows[entry])
+
+    def rows_for(self, queries: Sequence[str]) -> List[int]:
+        rows = set()
+        for match in self.match_many(queries):
+            if match is not None:
+                rows.update(match.rows)
+        return sorted(rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self.labels), "memo": len(self._memo), "hits": self.hits, "misses": self.misses}
+
+
+_matchers: 'weakref.WeakKeyDictionary[PriceIndex, ProductMatcher]' = weakref.WeakKeyDictionary()
+_matchers_lock = threading.Lock()
+
+
+def matcher_for(price_index: PriceIndex) -> ProductMatcher:
+    # One matcher per catalog, same as solver.solver_for
+    with _matchers_lock:
+        if (matcher := _matchers.get(price_index)) is None:
+            matcher = _matchers[price_index] = ProductMatcher(price_index)
+        return matcher
@@ -0,0 +1,101 @@
+import sys
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from peewee import *
+from peewee import Model
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[object], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    # Registers a schema change. Versions only ever increase; a migration that has shipped is never edited,
+    # later changes get a new version. Each one receives the CompanyDBManager and runs inside a transaction.
+    def register(apply: Callable[[object], None]) -> Callable[[object], None]:
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"Migration {version} must come after {MIGRATIONS[-1].version}")
+        MIGRATIONS.append(Migration(version, description, apply))
+        return apply
+
+    return register
+
+
+@migration(1, "Index payments by (company_id, bank_name) for lookups by bank name")
+def index_payment_bank_name(manager) -> None:
+    # Creates the indexes declared on Payment that are missing (IF NOT EXISTS), i.e. the one added after
+    # databases were already in use. New databases got it when CompanyDBManager created the table.
+    manager.payment_model._schema.create_indexes(safe=True)
+
+
+class MigrationRunner:
+    # Tracks the applied versions in a schema_version table next to the CompanyDBManager tables. CompanyDBManager
+    # only creates missing tables from the models; migrations bring existing tables up to the same schema.
+    def __init__(self, manager) -> None:
+
+        class SchemaVersion(Model):
+            version = IntegerField(primary_key=True)
+            description = CharField()
+            applied_at = DateTimeField()
+
+            class Meta:
+                database = manager.db
+                table_name = 'schema_version'
+
+        self.manager = manager
+        self.db: Database = manager.db
+        self.model: 'Model' = SchemaVersion
+        with self.db.connection_context():
+            self.db.create_tables([self.model], safe=True)
+
+    def applied_versions(self) -> List[int]:
+        with self.db.connection_context():
+            return [row.version for row in self.model.select(self.model.version).order_by(self.model.version)]
+
+    def current_version(self) -> int:
+        with self.db.connection_context():
+            return self.model.select(fn.MAX(self.model.version)).scalar() or 0
+
+    def pending(self) -> List[Migration]:
+        applied = set(self.applied_versions())
+        return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+    def migrate(self, target: Optional[int] = None) -> List[int]:
+        # Each migration and its version row commit together, so an interrupted run resumes where it stopped.
+        # If two processes race, the loser's version insert fails, its transaction rolls back and it moves on.
+        applied = []
+        for migration in self.pending():
+            if target is not None and migration.version > target:
+                break
+            try:
+                with self.db.connection_context(), self.db.atomic():
+                    migration.apply(self.manager)
+                    self.model.create(version=migration.version, description=migration.description, applied_at=datetime.now())
+            except (IntegrityError, OperationalError):
+                if migration.version not in self.applied_versions():
+                    raise
+                continue
+            applied.append(migration.version)
+        return applied
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] in (["status"], ["migrate"]):
+        import config
+        from database import CompanyDBManager, make_database
+
+        database_url = sys.argv[2] if len(sys.argv) > 2 else config.DATABASE_URL
+        runner = MigrationRunner(CompanyDBManager(make_database(database_url), migrate=False))
+        if sys.argv[1] == "migrate":
+            print(f"Applied {runner.migrate() or 'nothing'}")
+        print(f"Schema version {runner.current_version()}")
+        for migration in runner.pending():
+            print(f"Pending {migration.version}: {migration.description}")
+    else:
+        print("Usage: python migrations.py status|migrate [database URL or SQLite file]")
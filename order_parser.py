@@ -0,0 +1,79 @@
+import re
+import threading
+from typing import List, Optional
+
+from ai import Order
+from database import CompanyDBManager
+
+# Thousands separators are only accepted in groups of three, e.g. £1,000.50
+AMOUNT_LINE = re.compile(r"^(?:gbp|[£$€])?\s*(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?\s*(?:gbp|pounds?)?$", re.IGNORECASE)
+ALL_PRODUCTS = {".", "all", "random", "any"}
+
+
+class OrderParser:
+    # Fast path for orders sent in the documented /add_order_from_string layout, one field per line:
+    #   customer detail / amount / [bank name] / [payment name or number] / products, comma separated / company
+    # Returns None whenever the text doesn't fit that layout or doesn't check out against the database,
+    # and the caller falls back to the LLM extractor.
+    def __init__(self, db: CompanyDBManager) -> None:
+        self.db = db
+        self.attempts = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    def split_lines(self, text: str) -> List[str]:
+        # The help text shows "\n" typed literally, so accept that as well as real line breaks
+        text = text.strip().strip('"').replace("\\n", "\n")
+        return [line.strip() for line in text.splitlines() if line.strip()]
+
+    def parse(self, text: str) -> Optional[Order]:
+        order = self._parse(text)
+        with self._lock:
+            self.attempts += 1
+            if order is not None:
+                self.hits += 1
+        return order
+
+    def _parse(self, text: str) -> Optional[Order]:
+        lines = self.split_lines(text)
+        # Without a bank or payment line there is no payment to invoice against
+        if len(lines) not in (5, 6):
+            return None
+
+        customer_detail, payment_amount, *middle, products_line, company_name = lines
+        if not AMOUNT_LINE.match(payment_amount):
+            return None
+        # extract_number_and_convert_to_float stops at the first comma, so "£1,000.50" would invoice £1
+        payment_amount = payment_amount.replace(",", "")
+        if not self.db.company_exists(company_name):
+            return None
+
+        if len(middle) == 2:
+            bank_name, payment_name_or_number = middle
+        else:
+            # A single optional line may be either, get_payment_by_name_or_bank matches both
+            bank_name, payment_name_or_number = None, middle[0]
+        # The handlers look the payment up by payment_name_or_number first, so only keep it if it resolves
+        choice = next((key for key in (payment_name_or_number, bank_name) if key and self.db.get_payment_by_name_or_bank(company_name, key)), None)
+        if choice is None:
+            return None
+        if choice != payment_name_or_number:
+            payment_name_or_number = None
+
+        if products_line.lower() in ALL_PRODUCTS:
+            product_names = []
+        else:
+            product_names = [name.strip() for name in products_line.split(",") if name.strip()]
+
+        return Order(
+            customer_detail=customer_detail,
+            payment_amount=payment_amount,
+            bank_name=bank_name,
+            payment_name_or_number=payment_name_or_number,
+            product_names=product_names,
+            company_name=company_name,
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"attempts": self.attempts, "hits": self.hits, "hit_rate": self.hits / self.attempts if self.attempts else 0.0}
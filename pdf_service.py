@@ -0,0 +1,295 @@
+import abc
+import asyncio
+import io
+import multiprocessing
+import re
+import subprocess
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import config
+
+
+class RenderError(Exception):
+    pass
+
+
+class RenderQueueFull(RenderError):
+    pass
+
+
+class RenderTimeout(RenderError):
+    pass
+
+
+def wkhtmltopdf_args(options: Dict[str, object]) -> List[str]:
+    # Same option mapping as pdfkit: {"enable-local-file-access": True} -> --enable-local-file-access
+    args = []
+    for name, value in options.items():
+        if value is False or value is None:
+            continue
+        args.append(f"--{name}")
+        if value is not True and value != "":
+            args.append(str(value))
+    return args
+
+
+class PdfBackend(abc.ABC):
+    # Turns one HTML document into PDF bytes on the service's event loop
+    name = ""
+
+    @abc.abstractmethod
+    async def render(self, html: str, timeout: float) -> bytes:
+        ...
+
+    @abc.abstractmethod
+    def convert(self, html: str, timeout: float = config.PDF_TIMEOUT) -> bytes:
+        # Blocking render for callers that are already one worker per invoice, e.g. batch.py's process pool
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class WkhtmltopdfBackend(PdfBackend):
+    # One wkhtmltopdf process per invoice, HTML on stdin and the PDF on stdout
+    name = "wkhtmltopdf"
+
+    def __init__(self, wkhtmltopdf: str = config.WKHTMLTOPDF_PATH, options: Optional[Dict[str, object]] = None) -> None:
+        self.command = [wkhtmltopdf, "--quiet", *wkhtmltopdf_args(options or {"enable-local-file-access": True}), "-", "-"]
+
+    async def render(self, html: str, timeout: float) -> bytes:
+        process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            pdf, errors = await asyncio.wait_for(process.communicate(html.encode("utf-8")), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise RenderTimeout(f"wkhtmltopdf did not finish within {timeout}s")
+        # wkhtmltopdf exits with 1 when a referenced resource failed to load but still writes the PDF
+        if process.returncode not in (0, 1) or not pdf:
+            raise RenderError(f"wkhtmltopdf exited with {process.returncode}: {errors.decode(errors='replace').strip()}")
+        return pdf
+
+    def convert(self, html: str, timeout: float = config.PDF_TIMEOUT) -> bytes:
+        try:
+            process = subprocess.run(self.command, input=html.encode("utf-8"), capture_output=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise RenderTimeout(f"wkhtmltopdf did not finish within {timeout}s")
+        if process.returncode not in (0, 1) or not process.stdout:
+            raise RenderError(f"wkhtmltopdf exited with {process.returncode}: {process.stderr.decode(errors='replace').strip()}")
+        return process.stdout
+
+
+FONT_FACE = re.compile(r"@font-face\s*{[^}]*}")
+LOCAL_SOURCE = re.compile(r"local\([^)]*\)\s*,?\s*")
+
+
+def without_local_fonts(html: str) -> str:
+    # xhtml2pdf can't parse local() font sources, drop them and any @font-face left without a url()
+    def strip(match: re.Match) -> str:
+        rule = LOCAL_SOURCE.sub("", match.group(0))
+        return rule if "url(" in rule else ""
+
+    return FONT_FACE.sub(strip, html)
+
+
+def xhtml2pdf_convert(html: str) -> bytes:
+    from xhtml2pdf import pisa
+
+    output = io.BytesIO()
+    result = pisa.CreatePDF(without_local_fonts(html), dest=output)
+    if result.err:
+        raise RenderError(f"xhtml2pdf reported {result.err} errors")
+    return output.getvalue()
+
+
+def weasyprint_convert(html: str) -> bytes:
+    from weasyprint import HTML
+
+    return HTML(string=html, base_url=".").write_pdf()
+
+
+IN_PROCESS_CONVERTERS: Dict[str, Callable[[str], bytes]] = {
+    "xhtml2pdf": xhtml2pdf_convert,
+    "weasyprint": weasyprint_convert,
+}
+
+
+class InProcessBackend(PdfBackend):
+    # Renders with a Python library on a pool of long-lived workers, so no process is spawned per invoice.
+    # The converters hold the GIL for most of the work, which is why the default pool is processes.
+    # A timed out render is abandoned, not killed; its worker stays busy until the converter returns.
+    def __init__(self, name: str, workers: int, kind: str = config.PDF_EXECUTOR) -> None:
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported executor kind for the PDF backend: {kind}")
+        self.name = name
+        self.converter = IN_PROCESS_CONVERTERS[name]
+        self.workers = workers
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        # Only touched from the service's loop thread
+        if self._executor is None:
+            if self.kind == "process":
+                # Spawned like the executor stages' pools, the service's loop thread must not be forked
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"pdf-{self.name}")
+        return self._executor
+
+    async def render(self, html: str, timeout: float) -> bytes:
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self.converter, html)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise RenderTimeout(f"{self.name} did not finish within {timeout}s")
+        except RenderError:
+            raise
+        except Exception as error:
+            raise RenderError(f"{self.name} failed: {error}") from error
+
+    def convert(self, html: str, timeout: float = config.PDF_TIMEOUT) -> bytes:
+        # Runs on the calling thread, so the timeout can't be enforced here
+        try:
+            return self.converter(html)
+        except RenderError:
+            raise
+        except Exception as error:
+            raise RenderError(f"{self.name} failed: {error}") from error
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def make_backend(
+    name: str = config.PDF_BACKEND,
+    workers: int = config.PDF_WORKERS,
+    wkhtmltopdf: str = config.WKHTMLTOPDF_PATH,
+    options: Optional[Dict[str, object]] = None,
+) -> PdfBackend:
+    if name == WkhtmltopdfBackend.name:
+        return WkhtmltopdfBackend(wkhtmltopdf, options)
+    if name in IN_PROCESS_CONVERTERS:
+        return InProcessBackend(name, workers)
+    raise ValueError(f"Unknown PDF backend: {name}")
+
+
+class PdfRenderService:
+    # Renders HTML to PDF with at most `workers` renders at a time on the configured backend. The backend is driven
+    # from a loop running in a background thread, so neither the bot's event loop nor the calling thread does any
+    # of the work; callers on any loop await render(), plain threads call render_sync().
+    def __init__(
+        self,
+        workers: int = config.PDF_WORKERS,
+        queue_limit: int = config.PDF_QUEUE_LIMIT,
+        timeout: float = config.PDF_TIMEOUT,
+        backend: str = config.PDF_BACKEND,
+        wkhtmltopdf: str = config.WKHTMLTOPDF_PATH,
+        options: Optional[Dict[str, object]] = None,
+    ) -> None:
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.backend = make_backend(backend, workers, wkhtmltopdf, options)
+
+        self.pending = 0
+        self.rendered = 0
+        self.failed = 0
+        self._pending_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run() -> None:
+                    asyncio.set_event_loop(loop)
+                    self._slots = asyncio.Semaphore(self.workers)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name="pdf-render", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def _check_capacity(self) -> None:
+        if self.pending >= self.queue_limit:
+            raise RenderQueueFull(f"{self.pending} PDFs already queued, try again later")
+
+    def _admit(self) -> None:
+        with self._pending_lock:
+            self._check_capacity()
+            self.pending += 1
+
+    def ensure_capacity(self) -> None:
+        # Like Stage.ensure_capacity: raises RenderQueueFull now if a render would be refused
+        with self._pending_lock:
+            self._check_capacity()
+
+    def _release(self, ok: bool) -> None:
+        with self._pending_lock:
+            self.pending -= 1
+            if ok:
+                self.rendered += 1
+            else:
+                self.failed += 1
+
+    async def _render(self, html: str) -> bytes:
+        async with self._slots:
+            return await self.backend.render(html, self.timeout)
+
+    def _submit(self, html: str):
+        loop = self._ensure_started()
+        self._admit()
+        future = asyncio.run_coroutine_threadsafe(self._render(html), loop)
+        future.add_done_callback(lambda done: self._release(not done.cancelled() and done.exception() is None))
+        return future
+
+    async def render(self, html: str) -> bytes:
+        return await asyncio.wrap_future(self._submit(html))
+
+    def render_sync(self, html: str) -> bytes:
+        return self._submit(html).result()
+
+    def stats(self) -> dict:
+        with self._pending_lock:
+            return {"backend": self.backend.name, "workers": self.workers, "pending": self.pending, "rendered": self.rendered, "failed": self.failed}
+
+    def close(self) -> None:
+        with self._start_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self.backend.close)
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._loop = None
+
+
+_service: Optional[PdfRenderService] = None
+_service_lock = threading.Lock()
+
+
+def get_pdf_service() -> PdfRenderService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = PdfRenderService()
+        return _service
@@ -0,0 +1,187 @@
+import random
+import threading
+import time
+import weakref
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import config
+from catalog import PriceIndex
+
+
+class SolvedLine:
+    __slots__ = ('row_id', 'quantity', 'unit_price_pence', 'amount_pence')
+
+    def __init__(self, row_id: int, quantity: int, unit_price_pence: int, amount_pence: int) -> None:
+        self.row_id = row_id
+        self.quantity = quantity
+        self.unit_price_pence = unit_price_pence
+        self.amount_pence = amount_pence
+
+
+class Solution:
+    __slots__ = ('lines', 'delivery_pence', 'gap_pence', 'attempts', 'seconds')
+
+    def __init__(self, lines: List[SolvedLine], delivery_pence: int, gap_pence: int, attempts: int = 0, seconds: float = 0.0) -> None:
+        self.lines = lines
+        self.delivery_pence = delivery_pence
+        self.gap_pence = gap_pence  # target - (lines + delivery), 0 for an exact fit
+        self.attempts = attempts
+        self.seconds = seconds
+
+
+class ExactFitSolver:
+    # Picks products and pack quantities whose line totals plus a delivery charge add up to the target amount.
+    # Everything is done in integer pence: a coarse pass spreads the target over the picked lines, then a
+    # bounded multiple-choice knapsack over +/- window pence per line closes the remaining gap exactly.
+    def __init__(
+        self,
+        price_index: PriceIndex,
+        pack_size: int = 10,
+        max_quantity: int = 300,
+        max_delivery: float = 30,
+        tolerance: float = 0.01,
+        time_budget: float = 0.5,
+        window: float = 50,
+        max_choices: int = 16,
+        lines: Tuple[int, int] = (7, 20),
+    ) -> None:
+        self.price_index = price_index
+        self.pack_size = pack_size
+        self.quantities = np.arange(pack_size, max_quantity + 1, pack_size, dtype=np.int64)
+        # Rows with a blank price cell can't be priced, so they are never picked
+        self.priced = ~np.isnan(price_index.prices).any(axis=1)
+        self.unit_prices = np.rint(np.nan_to_num(price_index.prices) * 100).astype(np.int64)  # pence, per row and tier slot
+        self.tier_slots = np.searchsorted(price_index.tiers, self.quantities, side='right')
+        # Largest line total each row can reach within max_quantity, for the feasibility bound in solve
+        self.max_amounts = (self.unit_prices[:, self.tier_slots] * self.quantities).max(axis=1)
+        self.max_delivery = int(round(max_delivery * 100))
+        self.tolerance = int(round(tolerance * 100))
+        self.time_budget = time_budget
+        self.window = int(round(window * 100))
+        self.max_choices = max_choices
+        self.lines = lines
+
+    def solve(self, rows: Sequence[int], total_amount: float) -> Optional[Solution]:
+        target = int(round(total_amount * 100))
+        rows = [row for row in rows if self.priced[row]]
+        if not rows:
+            return None
+        # Even the most expensive lines at max_quantity plus the full delivery charge fall short: don't spend the
+        # time budget finding out, the caller's greedy fallback handles it
+        reachable = int(np.sort(self.max_amounts[rows])[-self.lines[1]:].sum()) + self.max_delivery
+        if reachable < target - self.tolerance:
+            return None
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        best = None
+        attempts = 0
+        while True:
+            attempts += 1
+            k = min(random.randint(*self.lines), len(rows))
+            solution = self._attempt(random.sample(rows, k), target)
+            if solution is not None and (best is None or abs(solution.gap_pence) < abs(best.gap_pence)):
+                best = solution
+            if (best is not None and best.gap_pence == 0) or time.perf_counter() >= deadline:
+                break
+        if best is None or abs(best.gap_pence) > self.tolerance:
+            return None
+        best.attempts = attempts
+        best.seconds = time.perf_counter() - start
+        return best
+
+    def _attempt(self, rows: List[int], target: int) -> Optional[Solution]:
+        rows = np.asarray(rows, dtype=np.int64)
+        unit_prices = self.unit_prices[rows][:, self.tier_slots]
+        amounts = unit_prices * self.quantities  # (lines, quantity steps)
+
+        # Drop the most expensive lines until every line fits at its smallest quantity
+        order = np.argsort(amounts[:, 0], kind='stable')
+        keep = order[np.cumsum(amounts[order, 0]) <= target]
+        if not len(keep):
+            return None
+        rows, unit_prices, amounts = rows[keep], unit_prices[keep], amounts[keep]
+        n = len(rows)
+
+        # Coarse pass: grow each line towards an even share of what is left, aiming at the middle of the delivery band
+        steps = np.zeros(n, dtype=np.int64)
+        current = int(amounts[:, 0].sum())
+        coarse_target = target - self.max_delivery // 2
+        for _ in range(2):
+            for i in range(n):
+                share = (coarse_target - current) // (n - i)
+                if share <= 0:
+                    break
+                limit = amounts[i, steps[i]] + share
+                fitting = np.where(amounts[i] <= limit, amounts[i], -1)
+                step = int(np.argmax(fitting))
+                current += int(amounts[i, step] - amounts[i, steps[i]])
+                steps[i] = step
+
+        # Fine pass: every line may move to any quantity whose amount is within +/- window of its current one
+        window = self.window
+        choices = []
+        for i in range(n):
+            deltas = amounts[i] - amounts[i, steps[i]]
+            candidates = np.nonzero(np.abs(deltas) <= window)[0]
+            if len(candidates) > self.max_choices:
+                candidates = candidates[np.argsort(np.abs(deltas[candidates]), kind='stable')[:self.max_choices]]
+            choices.append((candidates, deltas[candidates] + window))
+
+        size = 2 * window * n + 1
+        reach = np.zeros(size, dtype=bool)
+        reach[0] = True
+        picked = np.full((n, size), -1, dtype=np.int16)
+        high = 0
+        for i, (_, shifts) in enumerate(choices):
+            reached = np.zeros(size, dtype=bool)
+            source = reach[:high + 1]
+            for c, shift in enumerate(shifts):
+                target_slice = slice(shift, shift + high + 1)
+                fresh = source & ~reached[target_slice]
+                picked[i, target_slice][fresh] = c
+                reached[target_slice] |= source
+            reach = reached
+            high += 2 * window
+
+        # Offset sums in [lo, hi] leave a delivery charge between 0 and max_delivery
+        offset = n * window - current
+        lo, hi = target - self.max_delivery + offset, target + offset
+        reachable = np.nonzero(reach)[0]
+        inside = reachable[(reachable >= lo) & (reachable <= hi)]
+        if len(inside):
+            index = int(inside.max())
+        else:
+            index = int(reachable[np.argmin(np.minimum(np.abs(reachable - lo), np.abs(reachable - hi)))])
+
+        for i in range(n - 1, -1, -1):
+            candidates, shifts = choices[i]
+            c = picked[i, index]
+            steps[i] = candidates[c]
+            index -= int(shifts[c])
+
+        lines = [
+            SolvedLine(int(rows[i]), int(self.quantities[steps[i]]), int(unit_prices[i, steps[i]]), int(amounts[i, steps[i]]))
+            for i in range(n)
+        ]
+        products = sum(line.amount_pence for line in lines)
+        delivery = min(max(target - products, 0), self.max_delivery)
+        return Solution(lines, delivery, target - products - delivery)
+
+
+_solvers: 'weakref.WeakKeyDictionary[PriceIndex, ExactFitSolver]' = weakref.WeakKeyDictionary()
+_solvers_lock = threading.Lock()
+
+
+def solver_for(price_index: PriceIndex) -> ExactFitSolver:
+    # One solver per catalog, so the pence price table is only built once
+    with _solvers_lock:
+        if (solver := _solvers.get(price_index)) is None:
+            solver = _solvers[price_index] = ExactFitSolver(
+                price_index,
+                max_quantity=config.SOLVER_MAX_QUANTITY,
+                tolerance=config.SOLVER_TOLERANCE,
+                time_budget=config.SOLVER_TIME_BUDGET,
+            )
+        return solver
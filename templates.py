@@ -0,0 +1,54 @@
+import os
+import threading
+from typing import Dict, List, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, select_autoescape
+
+import config
+from assets import asset_styles
+
+
+class TemplateRegistry:
+    # One Jinja environment per template directory for the whole process. Compiled templates are kept in memory
+    # and their bytecode on disk, so neither a new InvoiceGenerator nor a cold start re-parses invoice.html.
+    # In dev mode Jinja checks the template mtimes on every lookup and recompiles edited files.
+    def __init__(self, html_dir: str = "html", cache_dir: Optional[str] = config.TEMPLATE_CACHE_DIR, dev_mode: bool = config.DEV_MODE) -> None:
+        self.html_dir = html_dir
+        self.dev_mode = dev_mode
+        bytecode_cache = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        self.env = Environment(
+            loader=FileSystemLoader(html_dir),
+            autoescape=select_autoescape(("html",)),
+            bytecode_cache=bytecode_cache,
+            auto_reload=dev_mode,
+            cache_size=-1,
+        )
+        self.env.globals["asset_styles"] = asset_styles
+
+    def get(self, name: str) -> Template:
+        return self.env.get_template(name)
+
+    def warm(self) -> List[str]:
+        names = [name for name in self.env.list_templates() if name.endswith(".html")]
+        for name in names:
+            self.get(name)
+        return names
+
+
+_registries: Dict[str, TemplateRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(html_dir: str = "html") -> TemplateRegistry:
+    key = os.path.abspath(html_dir)
+    with _registries_lock:
+        if (registry := _registries.get(key)) is None:
+            registry = _registries[key] = TemplateRegistry(html_dir)
+        return registry
+
+
+def get_template(name: str, html_dir: str = "html") -> Template:
+    return get_registry(html_dir).get(name)
@@ -0,0 +1,8 @@
+from assets import FONT_WEIGHTS, asset_styles, bundled_fonts
+
+
+def test_every_template_weight_is_bundled():
+    assert sorted(bundled_fonts()) == sorted(FONT_WEIGHTS)
+    styles = asset_styles()
+    for path in bundled_fonts().values():
+        assert path.endswith(".ttf") and path.split("/")[-1] in styles
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+import pytest
+
+from batch import read_orders, resolve_jobs
+from database import CompanyDBManager, SqliteDatabase
+from invoice_store import InvoiceStore
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = CompanyDBManager(SqliteDatabase(str(tmp_path / "database.db")), cache=False)
+    company = db.add_company("XYZ Ltd", "1 Road", "", "London", "E1", "UK", "a@b.c", 1, "VAT", "GB1", None, "AB-1")
+    db.add_payment(company, "Main", "HSBC", 12345678, "00-00-00", "1 Bank St")
+    return db
+
+
+def test_blank_optional_columns(db, tmp_path):
+    path = tmp_path / "orders.csv"
+    path.write_text(
+        "customer_detail,payment_amount,payment_name_or_number,bank_name,product_names,company_name\n"
+        "John Doe,100,,HSBC,,XYZ Ltd\n"
+        "Jane Doe,200,Main,,\"Elf Bar, Lost Mary\",XYZ Ltd\n",
+        encoding="utf-8",
+    )
+    orders = read_orders(str(path))
+    assert orders[0]["payment_name_or_number"] is None and orders[0]["product_names"] is None
+    assert orders[1]["bank_name"] is None and orders[1]["product_names"] == ["Elf Bar", "Lost Mary"]
+
+    jobs, failures = resolve_jobs(db, orders, InvoiceStore(str(tmp_path / "invoices")), datetime.now())
+    assert failures == []
+    assert [job["invoice_number"] for job in jobs] == ["AB-1", "AB-2"]
+    assert [job["invoice"]["product_names"] for job in jobs] == [None, ["Elf Bar", "Lost Mary"]]
+
+
+def test_blank_optional_fields_in_jsonl(db, tmp_path):
+    path = tmp_path / "orders.jsonl"
+    path.write_text('{"customer_detail": "John Doe", "payment_amount": "100", "payment_name_or_number": "", "bank_name": "HSBC", "company_name": "XYZ Ltd"}\n', encoding="utf-8")
+    jobs, failures = resolve_jobs(db, read_orders(str(path)), InvoiceStore(str(tmp_path / "invoices")), datetime.now())
+    assert failures == [] and len(jobs) == 1
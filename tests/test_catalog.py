@@ -0,0 +1,20 @@
+import os
+import shutil
+
+from catalog import catalog_stats, clear_catalogs, current_catalog, get_catalog
+
+
+def test_current_catalog_reloads_a_changed_file(tmp_path):
+    path = str(tmp_path / "products.xlsx")
+    shutil.copy("products.xlsx", path)
+    clear_catalogs()
+    catalog = get_catalog(path)
+    assert current_catalog(path) is catalog
+
+    # As if /reload_products ran in another process after the file was replaced
+    os.utime(path, (catalog.mtime + 10, catalog.mtime + 10))
+    reloads = catalog_stats()["reloads"]
+    fresh = current_catalog(path)
+    assert fresh is not catalog and fresh.mtime == catalog.mtime + 10
+    assert catalog_stats()["reloads"] == reloads + 1
+    assert current_catalog(path) is fresh and get_catalog(path) is fresh
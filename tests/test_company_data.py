@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from database import CompanyDBManager, SqliteDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    return CompanyDBManager(SqliteDatabase(str(tmp_path / "database.db")))
+
+
+def company(name, **fields):
+    row = {
+        "name": name, "address1": "1 Road", "address2": "", "city": "London", "postcode": "E1", "country": "UK",
+        "email": "a@b.c", "company_number": "1", "vat_reg": "VAT", "vat_number": "GB1", "logo": "", "invoice_number": "AB-1",
+    }
+    row.update(fields)
+    return row
+
+
+def test_failed_import_clears_cache(db):
+    db.import_companies([company("A")])
+    assert db.get_company_by_name("A").city == "London"
+    with pytest.raises(ValueError, match="Row 2"):
+        db.import_companies([company("A", city="Leeds"), company("B", company_number="x")], batch_size=1)
+    assert db.get_company_by_name("A").city == "Leeds"
+
+
+def payment(company_name, **fields):
+    row = {"company": company_name, "payment_name": "Main", "bank_name": "Tide", "account_number": "1", "sort_code": "00-00-00", "bank_address": "1 Bank St"}
+    row.update(fields)
+    return row
+
+
+def test_payment_import_rejects_unknown_company(db):
+    db.import_companies([company("A")])
+    with pytest.raises(ValueError, match="Row 2: unknown company 'Nope'"):
+        db.import_payments([payment("A"), payment("Nope")])
+    assert [row["company"] for row in db.export_payments()] == []
+    assert db.import_payments([payment("A")]) == 1
+    assert [row["company"] for row in db.export_payments()] == ["A"]
+
+
+def test_payment_name_beats_another_payments_bank_name(db):
+    db.import_companies([company("A")])
+    db.import_payments([
+        payment("A", payment_name="Tide", bank_name="Barclays", account_number="1"),
+        payment("A", payment_name="Main", bank_name="Tide", account_number="2"),
+    ])
+    assert db.get_payment_by_name_or_bank("A", "Tide").account_number == 1
+    assert db.get_order_context("A", "Tide")[1].account_number == 1
+    assert db.get_payment_by_name_or_bank("A", "Barclays").account_number == 1
+    assert db.get_order_context("A", "Nope") == (db.get_company_by_name("A"), None)
+
+
+def test_reserving_numbers_refreshes_cached_company(db):
+    db.import_companies([company("A")])
+    db.import_payments([payment("A")])
+    assert db.get_company_by_name("A").invoice_number == "AB-1"
+    assert db.get_order_context("A", "Main")[0].invoice_number == "AB-1"
+    assert db.reserve_invoice_numbers("A", 2) == ["AB-1", "AB-2"]
+    assert db.get_company_by_name("A").invoice_number == "AB-3"
+    assert db.get_order_context("A", "Main")[0].invoice_number == "AB-3"
+    assert db.get_payment_by_name_or_bank("A", "Main").company.invoice_number == "AB-3"
+
+
+def test_orders_keep_hitting_the_cache(db):
+    db.import_companies([company("A")])
+    db.import_payments([payment("A")])
+    numbers = []
+    for _ in range(10):
+        assert db.company_exists("A")
+        db.get_payment_by_name_or_bank("A", "Main")
+        company_row, _ = db.get_order_context("A", "Main")
+        numbers += db.reserve_invoice_numbers("A")
+    assert numbers == [f"AB-{n}" for n in range(1, 11)]
+    assert company_row.invoice_number == "AB-11"
+    stats = db.cache_stats()
+    assert (stats["hits"], stats["misses"]) == (27, 3)
+
+
+def test_concurrent_reservations_never_share_a_number(db):
+    db.import_companies([company("A")])
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        blocks = list(pool.map(lambda _: [db.reserve_invoice_numbers("A") for _ in range(50)], range(8)))
+    numbers = [number for block in blocks for [number] in block]
+    assert sorted(numbers, key=lambda number: int(number.split("-")[1])) == [f"AB-{n}" for n in range(1, 401)]
+    assert db.get_company_by_name("A").invoice_number == "AB-401"
+
+
+def test_released_numbers_are_reused_only_if_still_latest(db):
+    db.import_companies([company("A")])
+    first = db.reserve_invoice_numbers("A", 2)
+    assert db.release_invoice_numbers("A", first)
+    assert db.get_company_by_name("A").invoice_number == "AB-1"
+    assert db.reserve_invoice_numbers("A") == ["AB-1"]
+
+    [busy] = db.reserve_invoice_numbers("A")
+    db.reserve_invoice_numbers("A")
+    # Someone reserved after it, so it stays a gap rather than being handed out twice
+    assert not db.release_invoice_numbers("A", [busy])
+    assert db.reserve_invoice_numbers("A") == ["AB-4"]
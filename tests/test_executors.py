@@ -0,0 +1,34 @@
+import asyncio
+import threading
+
+import pytest
+
+from executors import Stage, StageBusy, get_stage, set_stage_initializer, shutdown_stages
+
+warmed = []
+
+
+def warm():
+    warmed.append(threading.current_thread().name)
+
+
+def test_stage_runs_its_initializer_in_each_worker(monkeypatch):
+    monkeypatch.setattr("executors._stages", {})
+    monkeypatch.setattr("executors._initializers", {})
+    monkeypatch.setattr("config.STAGE_DEFAULTS", {"warmup": ("thread", 1, 4)})
+    set_stage_initializer("warmup", warm)
+    stage = get_stage("warmup")
+    assert stage.initializer is warm
+
+    name = asyncio.run(stage.run(lambda: threading.current_thread().name))
+    shutdown_stages()
+    assert warmed == [name]
+
+
+def test_ensure_capacity_refuses_without_admitting():
+    stage = Stage("full", "thread", workers=1, queue_limit=0)
+    stage.ensure_capacity()
+    stage.pending = 1
+    with pytest.raises(StageBusy):
+        stage.ensure_capacity()
+    assert (stage.pending, stage.rejected) == (1, 1)
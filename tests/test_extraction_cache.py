@@ -0,0 +1,12 @@
+from extraction_cache import normalize_prompt
+
+
+def test_amounts_share_a_key():
+    assert normalize_prompt("Pay £1,200.00 now") == normalize_prompt("Pay  £1200 now ")
+    assert normalize_prompt("$ 99.50") == normalize_prompt("$99.5")
+
+
+def test_other_digits_and_case_are_kept():
+    assert normalize_prompt("acct 0012") != normalize_prompt("acct 12")
+    assert normalize_prompt("sort code 04-00-04") == "sort code 04-00-04"
+    assert normalize_prompt("SW1A 1AA\nElf Bar") != normalize_prompt("sw1a 1aa\nelf bar")
@@ -0,0 +1,49 @@
+import os
+from datetime import datetime
+
+import pytest
+from PIL import Image
+
+from batch import resolve_jobs
+from database import CompanyDBManager, SqliteDatabase
+from invoice_store import InvoiceStore
+from logos import LogoVariants, logo_uri
+
+
+@pytest.fixture
+def db(tmp_path):
+    return CompanyDBManager(SqliteDatabase(str(tmp_path / "database.db")), cache=False)
+
+
+def add_company(db, name, logo):
+    company = db.add_company(name, "1 Road", "", "London", "E1", "UK", "a@b.c", 1, "VAT", "GB1", logo, "AB-1")
+    db.add_payment(company, "Main", "Tide", 12345678, "00-00-00", "1 Bank St")
+
+
+def order(company_name):
+    return {"customer_detail": "John Doe", "payment_amount": "100", "bank_name": "Tide", "payment_name_or_number": None, "company_name": company_name, "product_names": []}
+
+
+def test_variant_of_missing_logo_is_source(tmp_path):
+    variants = LogoVariants(variant_dir=str(tmp_path / "variants"))
+    missing = str(tmp_path / "gone.jpg")
+    assert variants.get(None) is None
+    assert variants.get(missing) == missing
+    assert logo_uri(None) is None
+    assert logo_uri(missing) is None
+
+
+def test_logo_uri_points_at_variant(tmp_path, monkeypatch):
+    monkeypatch.setattr("logos._variants", LogoVariants(variant_dir=str(tmp_path / "variants")))
+    source = str(tmp_path / "logo.jpg")
+    Image.new("RGB", (800, 600), "red").save(source)
+    uri = logo_uri(source)
+    assert uri.startswith(f"file://{tmp_path / 'variants'}") and os.path.isfile(uri[len("file://"):])
+
+
+def test_resolve_jobs_without_logo(db, tmp_path):
+    add_company(db, "No Logo Ltd", None)
+    add_company(db, "Deleted Logo Ltd", str(tmp_path / "deleted.jpg"))
+    jobs, failures = resolve_jobs(db, [order("No Logo Ltd"), order("Deleted Logo Ltd")], InvoiceStore(str(tmp_path / "invoices")), datetime.now())
+    assert failures == []
+    assert [job["invoice"]["logo_path"] for job in jobs] == [None, None]
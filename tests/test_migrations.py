@@ -0,0 +1,31 @@
+from database import CompanyDBManager, SqliteDatabase
+from migrations import MigrationRunner
+
+
+def payment_indexes(database):
+    return {index.name for index in database.get_indexes("payment")}
+
+
+def test_migration_indexes_an_old_database(tmp_path):
+    path = str(tmp_path / "database.db")
+    old = SqliteDatabase(path)
+    CompanyDBManager(old, migrate=False)
+    # Back to the schema from before migration 1
+    old.execute_sql("DROP INDEX payment_company_id_bank_name")
+    old.close()
+
+    manager = CompanyDBManager(SqliteDatabase(path), migrate=False)
+    assert "payment_company_id_bank_name" not in payment_indexes(manager.db)
+    runner = MigrationRunner(manager)
+    assert [migration.version for migration in runner.pending()] == [1]
+
+    assert runner.migrate() == [1]
+    assert "payment_company_id_bank_name" in payment_indexes(manager.db)
+    assert runner.current_version() == 1
+    assert runner.migrate() == []
+
+
+def test_new_database_starts_indexed(tmp_path):
+    manager = CompanyDBManager(SqliteDatabase(str(tmp_path / "database.db")))
+    assert "payment_company_id_bank_name" in payment_indexes(manager.db)
+    assert MigrationRunner(manager).pending() == []
@@ -0,0 +1,26 @@
+import openai
+
+import ai
+from ai import Order, OrderExtractor
+
+ORDER = Order(customer_detail="John Doe", payment_amount="£100", bank_name="Tide", payment_name_or_number=None, company_name="XYZ Ltd")
+
+
+class StubChain:
+    def __init__(self):
+        self.prompts = []
+
+    def run(self, prompt):
+        # The extractor hands openai its pooled session before the chain makes a request
+        assert openai.requestssession is not None
+        self.prompts.append(prompt)
+        return [ORDER]
+
+
+def test_extract_order_uses_the_pooled_session(monkeypatch):
+    monkeypatch.setattr(ai, "create_extraction_chain_pydantic", lambda pydantic_schema, llm: StubChain())
+    extractor = OrderExtractor(openai_api_key="sk-test")
+    assert extractor.extract_order("order text") == [ORDER]
+    assert extractor.extract_order("order text") == [ORDER]
+    assert extractor.chain.prompts == ["order text", "order text"]
+    assert openai.requestssession is extractor._session
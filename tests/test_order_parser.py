@@ -0,0 +1,61 @@
+import pytest
+
+from database import CompanyDBManager, SqliteDatabase
+from order_parser import OrderParser
+from utils import extract_number_and_convert_to_float
+
+HELP_EXAMPLE = "John Doe, 123 Main St, City, Country\\n$1000\\nBank of America\\nPayment 123\\nProduct1, Product2, Product3\\nMy Company"
+
+
+@pytest.fixture
+def parser(tmp_path):
+    db = CompanyDBManager(SqliteDatabase(str(tmp_path / "database.db")))
+    company = db.add_company("My Company", "1 Road", "", "London", "E1", "UK", "a@b.c", 1, "VAT", "GB1", None, "AB-1")
+    db.add_payment(company, "Payment 123", "Bank of America", 12345678, "00-00-00", "1 Bank St")
+    return OrderParser(db)
+
+
+def test_help_text_example(parser):
+    order = parser.parse(f'"{HELP_EXAMPLE}"')
+    assert order.customer_detail == "John Doe, 123 Main St, City, Country"
+    assert order.payment_amount == "$1000"
+    assert (order.bank_name, order.payment_name_or_number) == ("Bank of America", "Payment 123")
+    assert order.product_names == ["Product1", "Product2", "Product3"]
+    assert order.company_name == "My Company"
+
+
+def test_five_line_layout(parser):
+    order = parser.parse("John Doe\n£250\nBank of America\nall\nMy Company")
+    # The single line is looked up as payment name or bank name, either way it lands in payment_name_or_number
+    assert (order.bank_name, order.payment_name_or_number) == (None, "Bank of America")
+    assert order.product_names == []
+    order = parser.parse("John Doe\n£250\nPayment 123\nElf Bar\nMy Company")
+    assert order.payment_name_or_number == "Payment 123" and order.product_names == ["Elf Bar"]
+
+
+def test_six_line_layout_with_unknown_payment_name_keeps_bank(parser):
+    order = parser.parse("John Doe\n£250\nBank of America\nPayment 999\nall\nMy Company")
+    assert (order.bank_name, order.payment_name_or_number) == ("Bank of America", None)
+
+
+@pytest.mark.parametrize("text", [
+    "John Doe\n£250\nBank of America\nall\nOther Company",
+    "John Doe\n£250\nNo Such Bank\nall\nMy Company",
+    "John Doe\nabout 250\nBank of America\nall\nMy Company",
+    "John Doe\n£250\nall\nMy Company",
+    "John Doe\n£1,00,0\nBank of America\nall\nMy Company",
+])
+def test_falls_back_to_the_extractor(parser, text):
+    assert parser.parse(text) is None
+
+
+@pytest.mark.parametrize("amount, value", [("£1,000.50", 1000.5), ("£12,345", 12345.0), ("1,000 GBP", 1000.0), ("£999.99", 999.99)])
+def test_comma_amounts(parser, amount, value):
+    order = parser.parse(f"John Doe\n{amount}\nBank of America\nall\nMy Company")
+    assert extract_number_and_convert_to_float(order.payment_amount) == value
+
+
+def test_stats(parser):
+    parser.parse(HELP_EXAMPLE)
+    parser.parse("not an order")
+    assert parser.stats() == {"attempts": 2, "hits": 1, "hit_rate": 0.5}
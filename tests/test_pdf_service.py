@@ -0,0 +1,22 @@
+import pytest
+
+from pdf_service import InProcessBackend, PdfBackend
+
+
+def test_backends_must_implement_render_and_convert():
+    with pytest.raises(TypeError):
+        PdfBackend()
+
+    class RenderOnly(PdfBackend):
+        async def render(self, html, timeout):
+            return b""
+
+    with pytest.raises(TypeError):
+        RenderOnly()
+
+
+def test_xhtml2pdf_converts_in_process():
+    pytest.importorskip("xhtml2pdf")
+    backend = InProcessBackend("xhtml2pdf", workers=1, kind="thread")
+    assert backend.convert("<html><body><p>Invoice</p></body></html>").startswith(b"%PDF")
+    backend.close()
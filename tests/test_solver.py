@@ -0,0 +1,35 @@
+import random
+import time
+
+import pytest
+
+import config
+from ai import InvoiceGenerator
+from catalog import get_catalog
+from solver import solver_for
+
+
+@pytest.fixture
+def price_index():
+    return get_catalog("products.xlsx").price_index
+
+
+@pytest.mark.parametrize("amount", [150, 900, 2500, 6000, 12000])
+def test_feasible_amounts_fit_exactly_within_the_cap(price_index, amount):
+    random.seed(0)
+    solution = solver_for(price_index).solve(list(range(len(price_index))), amount)
+    assert solution is not None
+    assert sum(line.amount_pence for line in solution.lines) + solution.delivery_pence == round(amount * 100)
+    assert all(line.quantity <= config.SOLVER_MAX_QUANTITY for line in solution.lines)
+
+
+def test_unreachable_amount_falls_back_to_greedy(price_index):
+    solver = solver_for(price_index)
+    start = time.perf_counter()
+    assert solver.solve(list(range(len(price_index))), 50000) is None
+    # Rejected by the feasibility bound, not by running out the time budget
+    assert time.perf_counter() - start < solver.time_budget / 10
+
+    line_items = InvoiceGenerator("invoice.html", catalog=get_catalog("products.xlsx")).generate_line_items(None, 50000)
+    assert line_items[-1].description == "Delivery"
+    assert len(line_items) > 1
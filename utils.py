@@ -1,5 +1,7 @@
 import json
+import os
 import re
+import tempfile
 
 def extract_number_and_convert_to_float(text: str) -> float:
     if numbers := re.findall(r'\d+\.?\d*', text):
@@ -11,3 +13,19 @@ def read_password_from_json(filepath: str) -> str:
     with open(filepath, 'r') as file:
         data = json.load(file)
         return data.get('password')
+
+def write_bytes(filepath: str, data: bytes) -> None:
+    # Write to a temp file in the same directory and rename it over the target,
+    # so readers only ever see the old file or the complete new one
+    directory = os.path.dirname(filepath) or '.'
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        os.remove(temp_path)
+        raise